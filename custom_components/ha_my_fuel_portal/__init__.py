@@ -9,18 +9,25 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, Platform
+from homeassistant.const import CONF_PASSWORD, CONF_URL, CONF_USERNAME, Platform
+from homeassistant.helpers.storage import Store
 from homeassistant.loader import async_get_loaded_integration
 
 from .api import MyFuelPortalApiClient
 from .const import DOMAIN
 from .coordinator import MyFuelPortalDataUpdateCoordinator
-from .data import MyFuelPortalCookieStorage, MyFuelPortalData
+from .data import MyFuelPortalData
+from .history import HistoryStore
+from .session import async_create_session, async_get_rate_limiter
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
 
-    from .data import MyFuelPortalConfigEntry
+    from .data import (
+        MyFuelPortalConfigEntry,
+        MyFuelPortalCookieStorage,
+        MyFuelPortalReadingStorage,
+    )
 
 PLATFORMS: list[Platform] = [
     Platform.SENSOR,
@@ -29,27 +36,64 @@ PLATFORMS: list[Platform] = [
 ]
 
 
+def _get_cookie_storage(
+    hass: HomeAssistant,
+    entry: MyFuelPortalConfigEntry,
+) -> MyFuelPortalCookieStorage:
+    return Store(hass, 1, f"{DOMAIN}/{entry.entry_id}.json")
+
+
+def _get_reading_storage(
+    hass: HomeAssistant,
+    entry: MyFuelPortalConfigEntry,
+) -> MyFuelPortalReadingStorage:
+    return Store(hass, 1, f"{DOMAIN}/{entry.entry_id}.readings")
+
+
 # https://developers.home-assistant.io/docs/config_entries_index/#setting-up-an-entry
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: MyFuelPortalConfigEntry,
 ) -> bool:
     """Set up this integration using UI."""
+    session = async_create_session(hass)
+    entry.async_on_unload(session.close)
     coordinator = MyFuelPortalDataUpdateCoordinator(
         hass=hass,
     )
+    client = MyFuelPortalApiClient(
+        username=entry.data[CONF_USERNAME],
+        password=entry.data[CONF_PASSWORD],
+        url=entry.data[CONF_URL],
+        session=session,
+        rate_limiter=async_get_rate_limiter(hass, entry.data[CONF_URL]),
+    )
+    cookies = _get_cookie_storage(hass, entry)
+    if (stored_session := await cookies.async_load()) is not None:
+        client.restore_session(stored_session)
+    readings = _get_reading_storage(hass, entry)
     entry.runtime_data = MyFuelPortalData(
-        client=MyFuelPortalApiClient(
-            username=entry.data[CONF_USERNAME],
-            password=entry.data[CONF_PASSWORD],
-        ),
+        client=client,
         integration=async_get_loaded_integration(hass, entry.domain),
         coordinator=coordinator,
-        cookies=MyFuelPortalCookieStorage(hass, 1, f"{DOMAIN}/{entry.entry_id}.json"),
+        cookies=cookies,
+        readings=readings,
+        history=HistoryStore(hass, entry.entry_id),
     )
 
-    # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
-    await coordinator.async_config_entry_first_refresh()
+    if (
+        stored_readings := await readings.async_load()
+    ) is not None and await coordinator.async_restore(stored_readings):
+        # Entities come up with the last readings while the portal is polled.
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+        )
+    else:
+        # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
+        await coordinator.async_config_entry_first_refresh()
+
+    if (unsubscribe := coordinator.async_track_temperature()) is not None:
+        entry.async_on_unload(unsubscribe)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
@@ -65,10 +109,19 @@ async def async_unload_entry(
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
 
+async def async_remove_entry(
+    hass: HomeAssistant,
+    entry: MyFuelPortalConfigEntry,
+) -> None:
+    """Forget the persisted portal session, readings and history of an entry."""
+    await _get_cookie_storage(hass, entry).async_remove()
+    await _get_reading_storage(hass, entry).async_remove()
+    await HistoryStore(hass, entry.entry_id).async_remove()
+
+
 async def async_reload_entry(
     hass: HomeAssistant,
     entry: MyFuelPortalConfigEntry,
 ) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    await hass.config_entries.async_reload(entry.entry_id)
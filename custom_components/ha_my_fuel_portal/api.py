@@ -1,14 +1,87 @@
-"""Sample API Client."""
+"""API Client for the fuel portal."""
 
 from __future__ import annotations
 
 import asyncio
-import json
+import collections
+import contextlib
+import dataclasses
+import importlib
 import socket
-from typing import Any
+import sys
+import time
+from http import HTTPStatus
+from http.cookiejar import http2time
+from http.cookies import SimpleCookie
+from typing import TYPE_CHECKING, Any, Literal, TypedDict, Unpack
 
+import aiohttp
 import async_timeout
-import mechanicalsoup
+from yarl import URL
+
+from .const import LOGGER
+from .metrics import ClientMetrics
+from .models import LoginForm
+from .throttle import CircuitBreaker
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+    from http.cookies import Morsel
+    from types import ModuleType
+
+    from .models import HistoryRecord, TankReading
+    from .parsing import Layout
+    from .throttle import TokenBucket
+
+# Parsing pulls in bs4 and lxml, so it is only imported on the first fetch.
+_PARSING_MODULE = f"{__package__}.parsing"
+
+# Consecutive communication failures before the portal is left alone.
+_BREAKER_THRESHOLD = 3
+_BREAKER_COOLDOWN = 5 * 60
+_BREAKER_MAX_COOLDOWN = 60 * 60
+
+_REQUEST_TIMEOUT = 10
+# Seconds before the login cookies expire at which to log in again anyway.
+_SESSION_EXPIRY_MARGIN = 60
+# Bytes of the tank page read, and parsed, at a time.
+_CHUNK_SIZE = 8192
+
+# Statuses of redirects, which the portal sends instead of a page when the
+# session has expired.
+_REDIRECT_STATUSES = frozenset(
+    (
+        HTTPStatus.MOVED_PERMANENTLY,
+        HTTPStatus.FOUND,
+        HTTPStatus.SEE_OTHER,
+        HTTPStatus.TEMPORARY_REDIRECT,
+        HTTPStatus.PERMANENT_REDIRECT,
+    )
+)
+# Where the portal redirects requests without a session.
+_LOGIN_PATH = "/Account/Login"
+# Other redirects followed in a row while loading a page.
+_MAX_REDIRECTS = 5
+# Form fields the credentials are filled into.
+_USERNAME_FIELD = "EmailAddress"
+_PASSWORD_FIELD = "Password"  # noqa: S105
+
+# History tables next to the tank page, by kind.
+HISTORY_PATHS = {
+    "deliveries": "/DeliveryHistory",
+    "readings": "/TankReadingHistory",
+}
+# History pages fetched at once while paging through a table.
+_HISTORY_CONCURRENCY = 4
+
+
+class _RequestOptions(TypedDict, total=False):
+    """Options of a request, passed on to the session as they are."""
+
+    data: dict | None
+    json: dict | None
+    headers: dict | None
+    allow_redirects: bool
 
 
 class MyFuelPortalApiClientError(Exception):
@@ -30,6 +103,8 @@ class MyFuelPortalApiClientAuthenticationError(
 def _verify_response_or_raise(response: aiohttp.ClientResponse) -> None:
     """Verify that the response is valid."""
     if response.status in (401, 403):
+        # A streamed body isn't read, so hand the connection back here.
+        response.release()
         msg = "Invalid credentials"
         raise MyFuelPortalApiClientAuthenticationError(
             msg,
@@ -37,6 +112,40 @@ def _verify_response_or_raise(response: aiohttp.ClientResponse) -> None:
     response.raise_for_status()
 
 
+async def _async_import_parsing() -> ModuleType:
+    """Import the parsing module, in the executor the first time."""
+    if (module := sys.modules.get(_PARSING_MODULE)) is None:
+        module = await asyncio.get_running_loop().run_in_executor(
+            None, importlib.import_module, _PARSING_MODULE
+        )
+    return module
+
+
+def _cookie_expiry(morsel: Morsel, now: float) -> float | None:
+    """Return the absolute expiry of a cookie, or None for session cookies."""
+    if max_age := morsel["max-age"]:
+        try:
+            return now + int(max_age)
+        except ValueError:
+            return None
+    if expires := morsel["expires"]:
+        return http2time(expires)
+    return None
+
+
+def _redirect_location(response: aiohttp.ClientResponse) -> URL | None:
+    """Return where a redirect points, or None if the response is a page."""
+    if response.status not in _REDIRECT_STATUSES:
+        return None
+    if (location := response.headers.get(aiohttp.hdrs.LOCATION)) is None:
+        return None
+    return response.url.join(URL(location))
+
+
+def _earliest_expiry(expiries: Iterable[float | None]) -> float | None:
+    return min((expires for expires in expiries if expires), default=None)
+
+
 class MyFuelPortalApiClient:
     """API Client for the fuel portal."""
 
@@ -45,108 +154,547 @@ class MyFuelPortalApiClient:
         username: str,
         password: str,
         url: str,
+        session: aiohttp.ClientSession,
+        rate_limiter: TokenBucket | None = None,
     ) -> None:
-        """API Client for the fuel portal."""
+        """
+        API Client for the fuel portal.
+
+        ``rate_limiter`` is shared by every client talking to the same host.
+        """
         self._username = username
         self._password = password
-        self._url = url
+        self._url = URL(url)
+        self._session = session
+        self._rate_limiter = rate_limiter
+        self.metrics = ClientMetrics()
+        self._breaker = CircuitBreaker(
+            _BREAKER_THRESHOLD, _BREAKER_COOLDOWN, _BREAKER_MAX_COOLDOWN
+        )
+        self._persisted_cookies: frozenset[tuple[str, str, str, str]] = frozenset()
+        # When each cookie expires, by name, as last set by the portal. A
+        # max-age counts from when the cookie was set, so it's worked out
+        # from each response setting the cookie.
+        self._cookie_expiries: dict[str, float | None] = {}
+        # The cookies set by logging in, whose expiry is the session's.
+        self._login_cookies: frozenset[str] = frozenset()
+        # The login form, with its action made absolute, once it has been
+        # scraped; later logins submit it without loading the login page.
+        self._login_form: LoginForm | None = None
+        # Held while logging in again, so concurrent page loads that find the
+        # session expired log in once; the count of logins tells a load that
+        # another one logged in while it waited.
+        self._login_lock = asyncio.Lock()
+        self._login_generation = 0
+        # Validators for the last parsed tank page, to skip unchanged pages.
+        self._tanks: dict[str, TankReading] | None = None
+        self._tank_digest: bytes | None = None
+        self._tank_etag: str | None = None
+        self._tank_last_modified: str | None = None
+        # Extractors for the tank box layouts seen on this portal.
+        self._layouts: dict[tuple, Layout] = {}
+        # When the portal last returned the tanks, as a timestamp; results
+        # served while the portal is failing don't change it.
+        self.last_fetched: float | None = None
+        # The fetch shared by every caller while it is in flight.
+        self._inflight: asyncio.Task[dict[str, TankReading]] | None = None
+
+    def _cookie_snapshot(self) -> frozenset[tuple[str, str, str, str]]:
+        return frozenset(
+            (morsel["domain"], morsel["path"], morsel.key, morsel.value)
+            for morsel in self._session.cookie_jar
+        )
+
+    def _note_cookies(self, response: aiohttp.ClientResponse) -> None:
+        """Note when the cookies a response (or its redirects) set expire."""
+        now = time.time()
+        for hop in (*response.history, response):
+            for name, morsel in hop.cookies.items():
+                self._cookie_expiries[name] = _cookie_expiry(morsel, now)
+
+    @property
+    def session_expires(self) -> float | None:
+        """Return when the login cookies expire, if known."""
+        return _earliest_expiry(
+            self._cookie_expiries.get(name) for name in self._login_cookies
+        )
+
+    def _session_expiring(self) -> bool:
+        """Return whether the login cookies have expired, or are about to."""
+        return (
+            expires := self.session_expires
+        ) is not None and time.time() >= expires - _SESSION_EXPIRY_MARGIN
+
+    def session_changed(self) -> bool:
+        """Return whether the cookies differ from the last exported session."""
+        return self._cookie_snapshot() != self._persisted_cookies
+
+    def export_session(self) -> dict:
+        """Export the login cookies so the session can outlive a restart."""
+        cookies = [
+            {
+                "name": morsel.key,
+                "value": morsel.value,
+                "domain": morsel["domain"],
+                "path": morsel["path"],
+                "expires": self._cookie_expiries.get(morsel.key),
+            }
+            for morsel in self._session.cookie_jar
+        ]
+        self._persisted_cookies = self._cookie_snapshot()
+        data: dict[str, Any] = {
+            "cookies": cookies,
+            "login_cookies": sorted(self._login_cookies),
+        }
+        if self._login_form is not None:
+            data["login_form"] = dataclasses.asdict(self._login_form)
+        return data
+
+    def restore_session(self, data: dict) -> None:
+        """Restore cookies previously returned by export_session."""
+        now = time.time()
+        cookies = [
+            cookie
+            for cookie in data.get("cookies", [])
+            if cookie.get("expires") is None or cookie["expires"] > now
+        ]
+        for cookie in cookies:
+            jar_cookie = SimpleCookie()
+            jar_cookie[cookie["name"]] = cookie["value"]
+            morsel = jar_cookie[cookie["name"]]
+            morsel["path"] = cookie["path"]
+            if cookie.get("expires") is not None:
+                morsel["max-age"] = str(int(cookie["expires"] - now))
+            self._session.cookie_jar.update_cookies(
+                jar_cookie,
+                URL.build(scheme=self._url.scheme, host=cookie["domain"]),
+            )
+            self._cookie_expiries[cookie["name"]] = cookie.get("expires")
+        self._persisted_cookies = self._cookie_snapshot()
+        self._login_cookies = frozenset(data.get("login_cookies", ()))
+        if (login_form := data.get("login_form")) is not None:
+            self._login_form = LoginForm(**login_form)
+
+    async def _load_tank_page(self, url: URL) -> aiohttp.ClientResponse:
+        headers = {}
+        if self._tanks is not None:
+            if self._tank_etag is not None:
+                headers[aiohttp.hdrs.IF_NONE_MATCH] = self._tank_etag
+            if self._tank_last_modified is not None:
+                headers[aiohttp.hdrs.IF_MODIFIED_SINCE] = self._tank_last_modified
+        with self.metrics.time("fetch"):
+            response = await self._api_wrapper(
+                method="get",
+                url=url,
+                headers=headers or None,
+                allow_redirects=False,
+                stream=True,
+            )
+        LOGGER.debug("Loaded %s (%s)", response.url, response.status)
+        return response
 
-        self._browser = mechanicalsoup.StatefulBrowser()
+    async def _parse_tank_page(
+        self, response: aiohttp.ClientResponse
+    ) -> dict[str, TankReading] | None:
+        """
+        Parse the tank page, reusing the last result if it is unchanged.
 
-    def _debug_print_page(self) -> None:
-        print(self._browser.page.title.text, self._browser.url)
+        Returns None if the page has no tanks.
+        """
+        self.metrics.page_fetches += 1
+        if response.status == HTTPStatus.NOT_MODIFIED and self._tanks is not None:
+            response.release()
+            self.metrics.unchanged_pages += 1
+            return self._tanks
 
-    def _load_tank_page(self) -> None:
-        self._browser.open(self.tank_url)
-        self._debug_print_page()
+        digest, tanks = await self._read_tanks(response)
+        if tanks is None:
+            self.metrics.unchanged_pages += 1
+        elif not tanks:
+            return None
+        elif self._tanks is not None and tanks == list(self._tanks.values()):
+            self.metrics.unchanged_pages += 1
+        else:
+            self._tanks = {tank.tank_id: tank for tank in tanks}
+        self._tank_digest = digest
+        self._tank_etag = response.headers.get(aiohttp.hdrs.ETAG)
+        self._tank_last_modified = response.headers.get(aiohttp.hdrs.LAST_MODIFIED)
+        return self._tanks
 
-    def _login(self) -> None:
-        self._browser.select_form(nr=0)
-        self._browser["EmailAddress"] = self.username
-        self._browser["Password"] = self.password
-        self._browser.submit_selected()
-        self._debug_print_page()
+    async def _load_login_form(self, url: URL) -> LoginForm:
+        return await self._read_login_form(
+            await self._api_wrapper(method="get", url=url)
+        )
+
+    async def _read_login_form(self, login_page: aiohttp.ClientResponse) -> LoginForm:
+        parsing = await _async_import_parsing()
+        form = parsing.parse_login_form(parsing.make_soup(await login_page.text()))
+        if form is None:
+            msg = f"Couldn't find a login form at {login_page.url}"
+            raise MyFuelPortalApiClientError(msg)
+        return dataclasses.replace(
+            form, action=str(login_page.url.join(URL(form.action)))
+        )
 
-    def _save_cookies(self) -> None:
-        cookies = dict(self._browser.get_cookiejar())
-        with _get_cookie_path().open("w") as f:
-            json.dump(cookies, f)
+    async def _read_tanks(
+        self, response: aiohttp.ClientResponse
+    ) -> tuple[bytes, list[TankReading] | None]:
+        """
+        Parse the tanks as the body of the tank page arrives.
 
-    def _load_cookies(self) -> None:
+        Returns a digest of the page's boxes, and the tanks in them, or None
+        if the boxes are those the last result came from. The page is read
+        to its end, so the connection can be reused, unless it goes on long
+        after its last box.
+        """
+        parsing = await _async_import_parsing()
+        parser = parsing.TankPageParser(
+            encoding=response.charset or "utf-8", layouts=self._layouts
+        )
+        parse_time = 0.0
         try:
-            with _get_cookie_path().open("r") as f:
-                cookies = json.load(f)
-                jar = self._browser.get_cookiejar()
-                for name, value in cookies.items():
-                    jar.set(name, value)
-        except FileNotFoundError:
-            return
-        except json.decoder.JSONDecodeError:
-            logger.exception("Failed to read json")
-
-    def get(self) -> int:
-        self._load_cookies()
-        self._load_tank_page()
-
-        if self._browser.url != self.tank_url:
-            self._login()
-            self._load_tank_page()
-
-        if self._browser.url != self.tank_url:
-            err = (
-                f"Failed to fetch tank page {self.tank_url}. "
-                f"Instead, wound up at {self._browser.url}."
+            async with async_timeout.timeout(_REQUEST_TIMEOUT):
+                async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+                    self.metrics.bytes_received += len(chunk)
+                    start = time.perf_counter()
+                    parser.feed(chunk)
+                    parse_time += time.perf_counter() - start
+                    if parser.done:
+                        break
+        except TimeoutError as exception:
+            msg = f"Timeout error reading {response.url} - {exception}"
+            raise MyFuelPortalApiClientCommunicationError(msg) from exception
+        except aiohttp.ClientError as exception:
+            msg = f"Error reading {response.url} - {exception}"
+            raise MyFuelPortalApiClientCommunicationError(msg) from exception
+        finally:
+            response.release()
+        digest = parser.digest
+        if self._tanks is not None and digest == self._tank_digest:
+            self.metrics.stages["parse"].record(parse_time)
+            return digest, None
+        start = time.perf_counter()
+        tanks = parser.close()
+        self.metrics.stages["parse"].record(parse_time + time.perf_counter() - start)
+        if parser.path == parsing.FAST_PATH:
+            self.metrics.fast_parses += 1
+        elif parser.path == parsing.LAYOUT_PATH:
+            self.metrics.layout_parses += 1
+        elif parser.path == parsing.TREE_PATH:
+            self.metrics.tree_parses += 1
+        LOGGER.debug("Parsed %d tanks on the %s path", len(tanks), parser.path)
+        return digest, tanks
+
+    async def _login_at(self, url: URL) -> None:
+        """Log in with the form on the login page at ``url``."""
+        self._login_form = await self._load_login_form(url)
+        await self._login(self._login_form)
+
+    async def _login(self, form: LoginForm) -> None:
+        """
+        Submit the login form, without following where it leads.
+
+        The portal redirects once logged in, and shows the form again when it
+        rejects the credentials; that form, with its fresh anti-forgery token,
+        replaces the cached one.
+        """
+        self.metrics.logins += 1
+        with self.metrics.time("login"):
+            response = await self._api_wrapper(
+                method=form.method,
+                url=form.action,
+                data={
+                    **form.fields,
+                    _USERNAME_FIELD: self._username,
+                    _PASSWORD_FIELD: self._password,
+                },
+                allow_redirects=False,
             )
-            raise TankReadError(err)
+        location = _redirect_location(response)
+        LOGGER.debug(
+            "Submitted login form (%s), redirected to %s", response.status, location
+        )
+        if location is None:
+            with contextlib.suppress(MyFuelPortalApiClientError):
+                self._login_form = await self._read_login_form(response)
+            msg = f"The portal rejected the credentials at {form.action}"
+            raise MyFuelPortalApiClientAuthenticationError(msg)
+        self._login_cookies = frozenset(response.cookies)
+        self._login_generation += 1
 
-        progress = self._browser.page.find("div", class_="progress-bar")
-        if progress is None:
-            err = "Couldn't find progress bar div"
-            raise TankReadError(err)
+    async def async_get_data(self) -> dict[str, TankReading]:
+        """
+        Get every tank on the account, by tank id, with a single page fetch.
 
+        Concurrent callers share one in-flight fetch (and login, if needed)
+        and its result. An unchanged tank page returns the previous result
+        object as is, and so does a portal that keeps failing, until it
+        recovers; ``last_fetched`` tells how old the result is.
+        """
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._async_fetch_tanks())
+            self._inflight.add_done_callback(self._fetch_done)
+        # Shield the shared fetch so one caller giving up doesn't cancel it
+        # for everyone else.
+        return await asyncio.shield(self._inflight)
+
+    def _fetch_done(self, task: asyncio.Task) -> None:
+        self._inflight = None
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller gave up.
+            task.exception()
+
+    async def _async_fetch_tanks(self) -> dict[str, TankReading]:
+        return await self._through_breaker(self._async_load_tanks, self._tanks)
+
+    async def _through_breaker[T](
+        self, load: Callable[[], Awaitable[T]], fallback: T | None = None
+    ) -> T:
+        """Load from the portal, unless the breaker holds requests back."""
+        if not self._breaker.allow_request():
+            if fallback is not None:
+                LOGGER.debug("Portal is failing, serving the last good result")
+                return fallback
+            msg = (
+                "The portal is failing, retrying in "
+                f"{self._breaker.retry_in():.0f} seconds"
+            )
+            raise MyFuelPortalApiClientCommunicationError(msg)
         try:
-            progress = int(progress.attrs["aria-valuenow"])
-        except ValueError as e:
-            err = "Failed to parse progress bar value {progress.attrs['aria-valuenow']}"
-            raise TankReadError(err) from e
+            result = await load()
+        except MyFuelPortalApiClientError as exception:
+            self.metrics.failures += 1
+            if isinstance(exception, MyFuelPortalApiClientCommunicationError):
+                self._breaker.record_failure()
+            raise
+        else:
+            self._breaker.record_success()
+        finally:
+            # The portal answered, but not with the page, or the load was
+            # cancelled; either way a later load probes again.
+            self._breaker.end_probe()
+        return result
 
-        self._save_cookies()
+    def _login_location(self, response: aiohttp.ClientResponse) -> URL | None:
+        """Return the login page a response redirects to, if it does."""
+        if (location := _redirect_location(response)) is None:
+            return None
+        login_paths = {_LOGIN_PATH.lower()}
+        if self._login_form is not None:
+            login_paths.add(URL(self._login_form.action).path.lower())
+        return location if location.path.lower() in login_paths else None
 
-        return progress
+    async def _load_following(
+        self,
+        load: Callable[[URL], Awaitable[aiohttp.ClientResponse]],
+        url: URL,
+    ) -> aiohttp.ClientResponse:
+        """Load a page, following redirects other than to the login page."""
+        for _ in range(_MAX_REDIRECTS + 1):
+            response = await load(url)
+            location = _redirect_location(response)
+            if location is None or self._login_location(response) is not None:
+                return response
+            LOGGER.debug("Following redirect from %s to %s", url, location)
+            url = location
+        msg = f"Too many redirects loading {url}"
+        raise MyFuelPortalApiClientCommunicationError(msg)
 
-    async def async_get_data(self) -> int:
-        """Get data from the API."""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.get)
+    async def _load_logged_in(
+        self,
+        load: Callable[[URL], Awaitable[aiohttp.ClientResponse]],
+        url: URL,
+    ) -> aiohttp.ClientResponse:
+        """
+        Load a page, logging in first if the portal redirects to its login.
+
+        Redirects aren't followed automatically, so an expired session is
+        noticed from the status and location alone; other redirects are
+        followed. When the login cookies are about to expire, the cached form
+        is submitted before loading the page, rather than after the portal
+        redirects away from it. Loads finding the session expired at the same
+        time log in once, and the others load their page again after it.
+        """
+        generation = self._login_generation
+        relogged_in = False
+        if self._login_form is not None and self._session_expiring():
+            async with self._login_lock:
+                if generation == self._login_generation:
+                    LOGGER.debug("Login cookies are expiring, logging in again")
+                    with contextlib.suppress(MyFuelPortalApiClientCommunicationError):
+                        await self._login(self._login_form)
+                relogged_in = generation != self._login_generation
+                generation = self._login_generation
+        response = await self._load_following(load, url)
+        if (login_url := self._login_location(response)) is None:
+            return response
+
+        async with self._login_lock:
+            if generation != self._login_generation:
+                response = await self._load_following(load, url)
+                if (login_url := self._login_location(response)) is None:
+                    return response
+            return await self._relogin(load, url, login_url, relogged_in=relogged_in)
+
+    async def _relogin(
+        self,
+        load: Callable[[URL], Awaitable[aiohttp.ClientResponse]],
+        url: URL,
+        login_url: URL,
+        *,
+        relogged_in: bool,
+    ) -> aiohttp.ClientResponse:
+        """
+        Log in after the portal redirected to ``login_url``, and load the page.
+
+        Login submits the cached form when there is one, and only loads the
+        login page if there isn't, or if the cached form fails without the
+        portal rejecting the credentials.
+        """
+        if self._login_form is not None and not relogged_in:
+            # A rotated anti-forgery token fails the submission or leaves
+            # the session logged out; either way, fetch a fresh form.
+            with contextlib.suppress(MyFuelPortalApiClientCommunicationError):
+                await self._login(self._login_form)
+                response = await self._load_following(load, url)
+                if self._login_location(response) is None:
+                    return response
+            self._login_form = None
+
+        await self._login_at(login_url)
+        response = await self._load_following(load, url)
+        if (location := self._login_location(response)) is not None:
+            msg = f"Failed to fetch {url}. Instead, redirected to {location}."
+            raise MyFuelPortalApiClientAuthenticationError(msg)
+        return response
+
+    async def _login_elsewhere(self, url: URL, generation: int) -> None:
+        """Log in at ``url``, unless another load has since ``generation``."""
+        async with self._login_lock:
+            if generation == self._login_generation:
+                LOGGER.debug("Redirected to %s, logging in there", url)
+                await self._login_at(url)
+
+    async def _async_load_tanks(self) -> dict[str, TankReading]:
+        generation = self._login_generation
+        response = await self._load_logged_in(self._load_tank_page, self._url)
+        tanks = await self._parse_tank_page(response)
+        if tanks is None and response.url != self._url:
+            # Redirected to a page without tanks, which is taken to be a login
+            # page at a path other than the usual one.
+            await self._login_elsewhere(response.url, generation)
+            response = await self._load_following(self._load_tank_page, self._url)
+            tanks = await self._parse_tank_page(response)
+        if tanks is None:
+            msg = f"Couldn't find tank info on {response.url}"
+            raise MyFuelPortalApiClientError(msg)
+        self.last_fetched = time.time()
+        return tanks
+
+    async def _load_history_page(self, url: URL) -> tuple[list[HistoryRecord], int]:
+        return await self._through_breaker(lambda: self._read_history_page(url))
+
+    async def _read_history_page(self, url: URL) -> tuple[list[HistoryRecord], int]:
+        def load(page_url: URL) -> Awaitable[aiohttp.ClientResponse]:
+            return self._api_wrapper(method="get", url=page_url, allow_redirects=False)
+
+        parsing = await _async_import_parsing()
+        generation = self._login_generation
+        response = await self._load_logged_in(load, url)
+        page = parsing.make_soup(await response.text())
+        if response.url != url and parsing.parse_login_form(page) is not None:
+            # Redirected to a login page at a path other than the usual one.
+            await self._login_elsewhere(response.url, generation)
+            response = await self._load_following(load, url)
+            page = parsing.make_soup(await response.text())
+        return parsing.parse_history_page(page)
+
+    async def async_iter_history(
+        self,
+        kind: Literal["deliveries", "readings"],
+        concurrency: int = _HISTORY_CONCURRENCY,
+    ) -> AsyncIterator[HistoryRecord]:
+        """
+        Yield the rows of a history table, in the order the portal lists them.
+
+        After the first page, up to ``concurrency`` further pages are fetched
+        at once, and each page is dropped once its rows are yielded, so memory
+        use doesn't grow with the length of the history. Pages still in
+        flight are cancelled if the caller stops early. Like the tank page,
+        each page goes through the circuit breaker, and pages that find the
+        session expired share one login.
+        """
+        url = self._url.join(URL(HISTORY_PATHS[kind]))
+        records, page_count = await self._load_history_page(url)
+        for record in records:
+            yield record
+
+        pending: collections.deque[asyncio.Task] = collections.deque()
+        try:
+            for page in range(2, page_count + 1):
+                pending.append(
+                    asyncio.create_task(
+                        self._load_history_page(url.with_query(page=page))
+                    )
+                )
+                if len(pending) < concurrency:
+                    continue
+                records, _ = await pending.popleft()
+                for record in records:
+                    yield record
+            while pending:
+                records, _ = await pending.popleft()
+                for record in records:
+                    yield record
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
     async def async_set_title(self, value: str) -> Any:
         """Get data from the API."""
-        return await self._api_wrapper(
+        response = await self._api_wrapper(
             method="patch",
             url="https://jsonplaceholder.typicode.com/posts/1",
-            data={"title": value},
+            json={"title": value},
             headers={"Content-type": "application/json; charset=UTF-8"},
         )
+        return await response.json()
 
     async def _api_wrapper(
         self,
         method: str,
-        url: str,
-        data: dict | None = None,
-        headers: dict | None = None,
-    ) -> Any:
-        """Get information from the API."""
+        url: str | URL,
+        *,
+        stream: bool = False,
+        **options: Unpack[_RequestOptions],
+    ) -> aiohttp.ClientResponse:
+        """
+        Get information from the API.
+
+        With ``stream`` the body of a page is left for the caller to read.
+        """
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
         try:
-            async with async_timeout.timeout(10):
+            async with async_timeout.timeout(_REQUEST_TIMEOUT):
                 response = await self._session.request(
                     method=method,
                     url=url,
-                    headers=headers,
-                    json=data,
+                    trace_request_ctx=self.metrics,
+                    **options,
                 )
+                self.metrics.requests += 1
+                self._note_cookies(response)
                 _verify_response_or_raise(response)
-                return await response.json()
+                if not stream or response.status in _REDIRECT_STATUSES:
+                    # Read the body while still under the timeout so the
+                    # connection is released back to the pool.
+                    self.metrics.bytes_received += len(await response.read())
+                return response
 
+        except MyFuelPortalApiClientError:
+            raise
         except TimeoutError as exception:
             msg = f"Timeout error fetching information - {exception}"
             raise MyFuelPortalApiClientCommunicationError(
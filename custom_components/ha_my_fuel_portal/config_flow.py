@@ -4,7 +4,9 @@ from __future__ import annotations
 
 import voluptuous as vol
 from homeassistant import config_entries, data_entry_flow
+from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.const import CONF_PASSWORD, CONF_URL, CONF_USERNAME
+from homeassistant.core import callback
 from homeassistant.helpers import selector
 
 from .api import (
@@ -13,7 +15,14 @@ from .api import (
     MyFuelPortalApiClientCommunicationError,
     MyFuelPortalApiClientError,
 )
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_MAX_STALE_AGE,
+    CONF_TEMPERATURE_ENTITY,
+    DEFAULT_MAX_STALE_AGE,
+    DOMAIN,
+    LOGGER,
+)
+from .session import async_create_session
 
 _DEFAULT_URL = "https://mysuperioraccountlogin.com/Tank"
 
@@ -23,6 +32,14 @@ class MyFuelPortalFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,  # noqa: ARG004
+    ) -> MyFuelPortalOptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return MyFuelPortalOptionsFlowHandler()
+
     async def async_step_user(
         self,
         user_input: dict | None = None,
@@ -83,9 +100,50 @@ class MyFuelPortalFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def _test_credentials(self, username: str, password: str, url: str) -> None:
         """Validate credentials."""
-        client = MyFuelPortalApiClient(
-            username=username,
-            password=password,
-            url=url,
+        async with async_create_session(self.hass) as session:
+            client = MyFuelPortalApiClient(
+                username=username,
+                password=password,
+                url=url,
+                session=session,
+            )
+            await client.async_get_data()
+
+
+class MyFuelPortalOptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for MyFuelPortal."""
+
+    async def async_step_init(
+        self,
+        user_input: dict | None = None,
+    ) -> data_entry_flow.FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                vol.Schema(
+                    {
+                        vol.Optional(CONF_TEMPERATURE_ENTITY): selector.EntitySelector(
+                            selector.EntitySelectorConfig(
+                                domain="sensor",
+                                device_class=SensorDeviceClass.TEMPERATURE,
+                            ),
+                        ),
+                        vol.Required(
+                            CONF_MAX_STALE_AGE, default=DEFAULT_MAX_STALE_AGE
+                        ): selector.NumberSelector(
+                            selector.NumberSelectorConfig(
+                                min=1,
+                                max=168,
+                                unit_of_measurement="h",
+                                mode=selector.NumberSelectorMode.BOX,
+                            ),
+                        ),
+                    },
+                ),
+                self.config_entry.options,
+            ),
         )
-        await client.async_get_data()
@@ -5,4 +5,12 @@ from logging import Logger, getLogger
 LOGGER: Logger = getLogger(__package__)
 
 DOMAIN = "ha_my_fuel_portal"
+
+CONF_TEMPERATURE_ENTITY = "temperature_entity"
+# Hours the last readings are shown for while the portal can't be reached.
+CONF_MAX_STALE_AGE = "max_stale_age"
+DEFAULT_MAX_STALE_AGE = 24
 ATTRIBUTION = "Data provided by http://jsonplaceholder.typicode.com/"
+
+# Sent with the config entry id after every poll, successful or not.
+SIGNAL_METRICS_UPDATED = f"{DOMAIN}_metrics_updated_{{}}"
@@ -2,23 +2,63 @@
 
 from __future__ import annotations
 
+import dataclasses
+import functools
+from collections import deque
 from datetime import timedelta
 from typing import TYPE_CHECKING, Any
 
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, UnitOfTemperature
+from homeassistant.core import Event, EventStateChangedData, callback
 from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+from homeassistant.util.unit_conversion import TemperatureConverter
 
 from .api import (
     MyFuelPortalApiClientAuthenticationError,
     MyFuelPortalApiClientError,
 )
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_MAX_STALE_AGE,
+    CONF_TEMPERATURE_ENTITY,
+    DEFAULT_MAX_STALE_AGE,
+    DOMAIN,
+    LOGGER,
+    SIGNAL_METRICS_UPDATED,
+)
+from .forecast import Forecast, forecast, heating_degrees
+from .models import TankReading
+from .scheduling import DEFAULT_INTERVAL, next_update_interval
+from .statistics import async_import_statistics
 
 if TYPE_CHECKING:
-    from homeassistant.core import HomeAssistant
+    from collections.abc import Iterable
+    from datetime import datetime
+
+    from homeassistant.core import CALLBACK_TYPE, HomeAssistant, State
 
+    from .api import MyFuelPortalApiClient
     from .data import MyFuelPortalConfigEntry
 
+# Coalesce cookie writes; the portal refreshes its session cookies on login.
+_SESSION_SAVE_DELAY = 30
+# Readings are saved after every successful poll, to start from on the next run.
+_READINGS_SAVE_DELAY = 60
+# Number of observed data changes kept to learn the portal's update time.
+_CHANGE_HISTORY = 14
+# Refresh requests arriving this many seconds after one another share a fetch.
+_REQUEST_REFRESH_COOLDOWN = 30
+# Fields an entity of a tank may show, which are its listener contexts.
+_FORECAST_FIELDS = tuple(field.name for field in dataclasses.fields(Forecast))
+_ALL_FIELDS = (
+    *(field.name for field in dataclasses.fields(TankReading)),
+    *_FORECAST_FIELDS,
+)
+
 
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
 class MyFuelPortalDataUpdateCoordinator(DataUpdateCoordinator):
@@ -35,14 +75,273 @@ class MyFuelPortalDataUpdateCoordinator(DataUpdateCoordinator):
             hass=hass,
             logger=LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(hours=1),
+            update_interval=DEFAULT_INTERVAL,
+            request_refresh_debouncer=Debouncer(
+                hass,
+                LOGGER,
+                cooldown=_REQUEST_REFRESH_COOLDOWN,
+                immediate=True,
+            ),
+            # The client hands back the same result when the page is
+            # unchanged, so skip notifying entities in that case.
+            always_update=False,
+        )
+        self._changes: deque[datetime] = deque(maxlen=_CHANGE_HISTORY)
+        self.forecasts: dict[str, Forecast] = {}
+        # When the data was last fetched from the portal.
+        self.last_fetched: datetime | None = None
+        # (tank id, field) listener contexts changed by the last update, or
+        # None when every listener should be updated.
+        self._changed_contexts: set[tuple[str, str]] | None = None
+
+    @property
+    def _temperature_entity(self) -> str | None:
+        return self.config_entry.options.get(CONF_TEMPERATURE_ENTITY)
+
+    @property
+    def _max_stale_age(self) -> timedelta:
+        return timedelta(
+            hours=self.config_entry.options.get(
+                CONF_MAX_STALE_AGE, DEFAULT_MAX_STALE_AGE
+            )
+        )
+
+    def _is_fresh(self, fetched: datetime | None) -> bool:
+        return fetched is not None and dt_util.utcnow() - fetched <= self._max_stale_age
+
+    def _temperature(self, state: State | None) -> float | None:
+        """Return the outdoor temperature in °C, if the entity has a valid one."""
+        if state is None:
+            return None
+        try:
+            value = float(state.state)
+        except ValueError:
+            return None
+        unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        if unit not in TemperatureConverter.VALID_UNITS:
+            return None
+        return TemperatureConverter.convert(value, unit, UnitOfTemperature.CELSIUS)
+
+    @callback
+    def async_track_temperature(self) -> CALLBACK_TYPE | None:
+        """Count degree-days as the configured outdoor temperature changes."""
+        if (entity_id := self._temperature_entity) is None:
+            return None
+
+        @callback
+        def _async_temperature_changed(event: Event[EventStateChangedData]) -> None:
+            if (temperature := self._temperature(event.data["new_state"])) is None:
+                return
+            self.config_entry.async_create_background_task(
+                self.hass,
+                self.config_entry.runtime_data.history.async_sample_temperature(
+                    event.time_fired, temperature
+                ),
+                f"{DOMAIN} sample temperature",
+            )
+
+        return async_track_state_change_event(
+            self.hass, entity_id, _async_temperature_changed
+        )
+
+    async def _async_forecast(
+        self, tank: TankReading, temperature: float | None
+    ) -> Forecast:
+        history = self.config_entry.runtime_data.history
+        daily_consumption = None
+        if temperature is not None:
+            burn_rate = await history.async_burn_rate(tank.tank_id, degree_days=True)
+            if burn_rate.rate is not None:
+                daily_consumption = burn_rate.rate * heating_degrees(temperature)
+        if daily_consumption is None:
+            burn_rate = await history.async_burn_rate(tank.tank_id, degree_days=False)
+            daily_consumption = burn_rate.rate
+        return forecast(tank, daily_consumption)
+
+    async def _async_import_statistics(self, tanks: dict[str, TankReading]) -> None:
+        history = self.config_entry.runtime_data.history
+        for tank_id, tank in tanks.items():
+            await async_import_statistics(
+                self.hass,
+                self.config_entry.entry_id,
+                tank_id,
+                tank.name or f"Tank {tank_id}",
+                await history.async_get(tank_id),
+            )
+
+    def _changes_from(
+        self,
+        data: dict[str, TankReading],
+        forecasts: dict[str, Forecast],
+    ) -> set[tuple[str, str]]:
+        """Return the (tank id, field) pairs that differ from the current data."""
+        changed = set()
+        for tank_id in self.data.keys() | data.keys():
+            tank = data.get(tank_id)
+            previous = self.data.get(tank_id)
+            if tank is None or previous is None:
+                changed.update((tank_id, field) for field in _ALL_FIELDS)
+                continue
+            changed.update((tank_id, field) for field in tank.diff(previous))
+            forecast = forecasts.get(tank_id)
+            previous_forecast = self.forecasts.get(tank_id)
+            changed.update(
+                (tank_id, field)
+                for field in _FORECAST_FIELDS
+                if getattr(forecast, field, None)
+                != getattr(previous_forecast, field, None)
+            )
+        return changed
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners of changed fields, and those without a context."""
+        changed, self._changed_contexts = self._changed_contexts, None
+        if changed is None:
+            super().async_update_listeners()
+            return
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in changed:
+                update_callback()
+
+    async def async_restore(self, stored: dict) -> bool:
+        """
+        Start from the readings saved by a previous run.
+
+        Returns False, leaving the data unset, when there are none or they
+        are older than the maximum stale age.
+        """
+        try:
+            # The data changes seen are kept even with stale readings, so
+            # polling needn't learn the portal's update time all over again.
+            self._changes.extend(
+                dt_util.as_local(dt_util.parse_datetime(change, raise_on_error=True))
+                for change in stored.get("changes", ())
+            )
+            fetched = dt_util.parse_datetime(stored["fetched"])
+            data = {
+                tank_id: TankReading.from_json(tank)
+                for tank_id, tank in stored["tanks"].items()
+            }
+        except (KeyError, TypeError, ValueError):
+            LOGGER.debug("Ignoring unreadable saved readings", exc_info=True)
+            return False
+        if not data or not self._is_fresh(fetched):
+            return False
+        temperature = None
+        if (entity_id := self._temperature_entity) is not None:
+            temperature = self._temperature(self.hass.states.get(entity_id))
+        self.forecasts = {
+            tank_id: await self._async_forecast(tank, temperature)
+            for tank_id, tank in data.items()
+        }
+        self.data = data
+        self.last_fetched = fetched
+        return True
+
+    @staticmethod
+    def _export_readings(
+        data: dict[str, TankReading], fetched: datetime, changes: Iterable[datetime]
+    ) -> dict:
+        return {
+            "fetched": fetched.isoformat(),
+            "tanks": {tank_id: tank.as_json() for tank_id, tank in data.items()},
+            "changes": [change.isoformat() for change in changes],
+        }
+
+    @staticmethod
+    def _export_session(client: MyFuelPortalApiClient) -> dict:
+        with client.metrics.time("cookie_save"):
+            return client.export_session()
+
+    def _note_fetched(
+        self, data: dict[str, TankReading], fetched: datetime, now: datetime
+    ) -> None:
+        """Save readings the portal returned, unless the client served old ones."""
+        if fetched == self.last_fetched:
+            # The client served its last result, as the portal is failing.
+            if not self._is_fresh(fetched):
+                self.update_interval = DEFAULT_INTERVAL
+                msg = f"The portal is failing; the readings from {fetched} are too old"
+                raise UpdateFailed(msg)
+            return
+        self.last_fetched = fetched
+        if self.data is not None and data != self.data:
+            self._changes.append(now)
+        self.config_entry.runtime_data.readings.async_delay_save(
+            functools.partial(
+                self._export_readings, data, fetched, list(self._changes)
+            ),
+            _READINGS_SAVE_DELAY,
         )
 
     async def _async_update_data(self) -> Any:
         """Update data via library."""
+        self._changed_contexts = None
+        runtime_data = self.config_entry.runtime_data
+        client = runtime_data.client
         try:
-            return await self.config_entry.runtime_data.client.async_get_data()
+            with client.metrics.time("update"):
+                data = await client.async_get_data()
         except MyFuelPortalApiClientAuthenticationError as exception:
             raise ConfigEntryAuthFailed(exception) from exception
         except MyFuelPortalApiClientError as exception:
+            # Don't wait out a long back-off to find out if the portal is back.
+            self.update_interval = DEFAULT_INTERVAL
+            if self.data is not None and self._is_fresh(self.last_fetched):
+                # Keep showing the last readings until they are too old.
+                LOGGER.warning(
+                    "Keeping the readings fetched at %s: %s",
+                    self.last_fetched,
+                    exception,
+                )
+                return self.data
             raise UpdateFailed(exception) from exception
+        finally:
+            if client.session_changed():
+                # The save may run after the entry is unloaded, so bind the
+                # client rather than looking it up then.
+                runtime_data.cookies.async_delay_save(
+                    functools.partial(self._export_session, client),
+                    _SESSION_SAVE_DELAY,
+                )
+            # Unchanged data doesn't reach the entities, but the metrics
+            # sensors should still see every poll.
+            async_dispatcher_send(
+                self.hass,
+                SIGNAL_METRICS_UPDATED.format(self.config_entry.entry_id),
+            )
+
+        now = dt_util.now()
+        self._note_fetched(data, dt_util.utc_from_timestamp(client.last_fetched), now)
+        temperature = degree_days = None
+        if (entity_id := self._temperature_entity) is not None and (
+            temperature := self._temperature(self.hass.states.get(entity_id))
+        ) is not None:
+            degree_days = await runtime_data.history.async_sample_temperature(
+                now, temperature
+            )
+        if data is not self.data:
+            forecasts = {
+                tank_id: await self._async_forecast(tank, temperature)
+                for tank_id, tank in data.items()
+            }
+            if self.data is not None and self.last_update_success:
+                # Entities only need updating for what changed, unless they
+                # are becoming available again.
+                self._changed_contexts = self._changes_from(data, forecasts)
+            self.forecasts = forecasts
+            if (
+                await runtime_data.history.async_record(data.values(), degree_days)
+                and "recorder" in self.hass.config.components
+            ):
+                # New readings are imported in bulk as long-term statistics,
+                # which also backfills the history on the first poll.
+                self.config_entry.async_create_background_task(
+                    self.hass,
+                    self._async_import_statistics(data),
+                    f"{DOMAIN} import statistics",
+                )
+        self.update_interval = next_update_interval(data.values(), self._changes, now)
+        LOGGER.debug("Next poll in %s", self.update_interval)
+        return data
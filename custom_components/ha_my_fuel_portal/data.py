@@ -12,10 +12,12 @@ if TYPE_CHECKING:
 
     from .api import MyFuelPortalApiClient
     from .coordinator import MyFuelPortalDataUpdateCoordinator
+    from .history import HistoryStore
 
 
 type MyFuelPortalConfigEntry = ConfigEntry[MyFuelPortalData]
 type MyFuelPortalCookieStorage = Store[dict]
+type MyFuelPortalReadingStorage = Store[dict]
 
 
 @dataclass
@@ -26,3 +28,5 @@ class MyFuelPortalData:
     coordinator: MyFuelPortalDataUpdateCoordinator
     integration: Integration
     cookies: MyFuelPortalCookieStorage
+    readings: MyFuelPortalReadingStorage
+    history: HistoryStore
@@ -0,0 +1,35 @@
+"""Diagnostics support for ha_my_fuel_portal."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .data import MyFuelPortalConfigEntry
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,  # noqa: ARG001 Unused function argument: `hass`
+    entry: MyFuelPortalConfigEntry,
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    runtime_data = entry.runtime_data
+    coordinator = runtime_data.coordinator
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "update_interval": str(coordinator.update_interval),
+        "last_update_success": coordinator.last_update_success,
+        "last_fetched": coordinator.last_fetched,
+        "session_expires": runtime_data.client.session_expires,
+        "metrics": runtime_data.client.metrics.as_dict(),
+        "tanks": {
+            tank_id: tank.as_dict() for tank_id, tank in coordinator.data.items()
+        },
+    }
@@ -2,21 +2,30 @@
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import ATTRIBUTION
 from .coordinator import MyFuelPortalDataUpdateCoordinator
 
+if TYPE_CHECKING:
+    from .models import TankReading
+
 
 class MyFuelPortalEntity(CoordinatorEntity[MyFuelPortalDataUpdateCoordinator]):
     """MyFuelPortalEntity class."""
 
     _attr_attribution = ATTRIBUTION
 
-    def __init__(self, coordinator: MyFuelPortalDataUpdateCoordinator) -> None:
+    def __init__(
+        self,
+        coordinator: MyFuelPortalDataUpdateCoordinator,
+        context: tuple[str, str] | None = None,
+    ) -> None:
         """Initialize."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, context)
         self._attr_unique_id = coordinator.config_entry.entry_id
         self._attr_device_info = DeviceInfo(
             identifiers={
@@ -26,3 +35,44 @@ class MyFuelPortalEntity(CoordinatorEntity[MyFuelPortalDataUpdateCoordinator]):
                 ),
             },
         )
+
+
+class MyFuelPortalTankEntity(MyFuelPortalEntity):
+    """
+    Entity for one tank on the account, with a device per tank.
+
+    The entity is only updated when ``key`` of its tank changes.
+    """
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        coordinator: MyFuelPortalDataUpdateCoordinator,
+        tank_id: str,
+        key: str,
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, (tank_id, key))
+        self._tank_id = tank_id
+        entry_id = coordinator.config_entry.entry_id
+        self._attr_unique_id = f"{entry_id}_{tank_id}_{key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={
+                (
+                    coordinator.config_entry.domain,
+                    f"{entry_id}_{tank_id}",
+                ),
+            },
+            name=coordinator.data[tank_id].name or f"Tank {tank_id}",
+        )
+
+    @property
+    def tank(self) -> TankReading | None:
+        """Return the latest data for this entity's tank."""
+        return self.coordinator.data.get(self._tank_id)
+
+    @property
+    def available(self) -> bool:
+        """Return if the tank is still on the account."""
+        return super().available and self.tank is not None
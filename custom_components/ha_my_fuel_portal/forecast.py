@@ -0,0 +1,191 @@
+"""Fuel consumption and refill forecasts from the reading history."""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .history import Reading
+    from .models import TankReading
+
+# Heating degree-days are counted below 65°F.
+HDD_BASE_CELSIUS = 18.3
+# Propane tanks are only ever filled to 80% of their size.
+FILL_LIMIT = 0.8
+# Temperature samples further apart than this are not interpolated.
+_MAX_SAMPLE_GAP = datetime.timedelta(hours=6)
+
+
+class LinearFit:
+    """Least squares line through points, kept as running sums."""
+
+    __slots__ = ("_n", "_sx", "_sxx", "_sxy", "_sy")
+
+    def __init__(self) -> None:
+        """Create a fit without points."""
+        self._n = 0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def __len__(self) -> int:
+        """Return the number of points."""
+        return self._n
+
+    def add(self, x: float, y: float) -> None:
+        """Add a point."""
+        self._n += 1
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+
+    @property
+    def slope(self) -> float | None:
+        """Return the slope of the line, if there are enough points."""
+        denominator = self._n * self._sxx - self._sx * self._sx
+        if self._n < 2 or math.isclose(denominator, 0, abs_tol=1e-9):  # noqa: PLR2004
+            return None
+        return (self._n * self._sxy - self._sx * self._sy) / denominator
+
+
+class BurnRate:
+    """
+    Fuel used per unit of ``x`` (days or degree-days) since the last delivery.
+
+    Readings are added oldest first. A rising level means fuel was delivered,
+    which starts a new fit, so each reading costs O(1) however long the
+    history is.
+    """
+
+    __slots__ = ("_fit", "_last")
+
+    def __init__(self) -> None:
+        """Create a burn rate without readings."""
+        self._fit = LinearFit()
+        self._last: tuple[float, float] | None = None
+
+    @classmethod
+    def from_points(cls, points: Iterable[tuple[float, float]]) -> BurnRate:
+        """Fit the points, oldest first."""
+        burn_rate = cls()
+        for x, y in points:
+            burn_rate.add(x, y)
+        return burn_rate
+
+    def add(self, x: float, fuel_remaining: float) -> None:
+        """Add a reading newer than every reading added so far."""
+        if self._last is not None and fuel_remaining > self._last[1]:
+            self._fit = LinearFit()
+        self._fit.add(x, fuel_remaining)
+        self._last = (x, fuel_remaining)
+
+    @property
+    def rate(self) -> float | None:
+        """Return the fuel used per unit of x, if known."""
+        if (slope := self._fit.slope) is None:
+            return None
+        return max(0.0, -slope)
+
+
+def day_points(readings: Iterable[Reading]) -> list[tuple[float, float]]:
+    """Return (day ordinal, fuel remaining) points of the readings."""
+    return [(reading.day.toordinal(), reading.fuel_remaining) for reading in readings]
+
+
+def degree_day_points(readings: Iterable[Reading]) -> list[tuple[float, float]]:
+    """Return (degree-days, fuel remaining) points of readings that have them."""
+    return [
+        (reading.degree_days, reading.fuel_remaining)
+        for reading in readings
+        if reading.degree_days is not None
+    ]
+
+
+def heating_degrees(temperature: float) -> float:
+    """Return the heating degrees of a temperature in °C."""
+    return max(0.0, HDD_BASE_CELSIUS - temperature)
+
+
+@dataclasses.dataclass(slots=True)
+class DegreeDays:
+    """A running total of heating degree-days, from temperature samples."""
+
+    total: float = 0.0
+    last_sample: datetime.datetime | None = None
+    last_temperature: float | None = None
+
+    def sample(self, when: datetime.datetime, temperature: float) -> None:
+        """Add the degree-days since the previous sample of the temperature."""
+        if (
+            self.last_sample is not None
+            and self.last_temperature is not None
+            and datetime.timedelta(0) < when - self.last_sample <= _MAX_SAMPLE_GAP
+        ):
+            elapsed = (when - self.last_sample) / datetime.timedelta(days=1)
+            self.total += (
+                elapsed
+                * (
+                    heating_degrees(self.last_temperature)
+                    + heating_degrees(temperature)
+                )
+                / 2
+            )
+        self.last_sample = when
+        self.last_temperature = temperature
+
+    def as_dict(self) -> dict:
+        """Return the total in its stored form."""
+        return {
+            "total": self.total,
+            "last_sample": None
+            if self.last_sample is None
+            else self.last_sample.isoformat(),
+            "last_temperature": self.last_temperature,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> DegreeDays:
+        """Load a total returned by as_dict."""
+        last_sample = data.get("last_sample")
+        return cls(
+            total=data.get("total", 0.0),
+            last_sample=None
+            if last_sample is None
+            else datetime.datetime.fromisoformat(last_sample),
+            last_temperature=data.get("last_temperature"),
+        )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Forecast:
+    """What the consumption so far says about a tank's future."""
+
+    daily_consumption: float | None = None
+    empty_date: datetime.date | None = None
+    refill_cost: float | None = None
+
+
+def forecast(tank: TankReading, daily_consumption: float | None) -> Forecast:
+    """Forecast when a tank runs empty and what filling it up would cost."""
+    remaining = tank.fuel_remaining
+    empty_date = None
+    if daily_consumption and remaining is not None and tank.data_last_read is not None:
+        empty_date = tank.data_last_read + datetime.timedelta(
+            days=math.floor(remaining / daily_consumption)
+        )
+
+    refill_cost = None
+    if tank.tank_size is not None and remaining is not None and tank.price is not None:
+        refill_cost = round(
+            max(0.0, tank.tank_size * FILL_LIMIT - remaining) * tank.price, 2
+        )
+
+    return Forecast(
+        daily_consumption=daily_consumption,
+        empty_date=empty_date,
+        refill_cost=refill_cost,
+    )
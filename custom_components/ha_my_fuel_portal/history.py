@@ -0,0 +1,278 @@
+"""Compact per-tank history of the readings seen on the portal."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import bisect
+import datetime
+import math
+import sys
+from array import array
+from typing import TYPE_CHECKING, NamedTuple
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .forecast import BurnRate, DegreeDays, day_points, degree_day_points
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from homeassistant.core import HomeAssistant
+
+    from .models import TankReading
+
+_STORAGE_VERSION = 1
+# Readings arrive at most a few times a day, so there's no hurry to write.
+_SAVE_DELAY = 60
+
+# Column typecodes: day ordinals and float values, NaN for missing ones.
+_DAY_TYPE = "i"
+_VALUE_TYPE = "d"
+
+
+class Reading(NamedTuple):
+    """The level of a tank, as read on one day."""
+
+    day: datetime.date
+    fuel_remaining: float
+    price: float | None
+    # Heating degree-days counted up to the reading, when a thermometer is
+    # configured.
+    degree_days: float | None = None
+
+
+def _nan_to_none(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+def _encode(column: array) -> str:
+    if sys.byteorder != "little":  # pragma: no cover
+        column = array(column.typecode, column)
+        column.byteswap()
+    return base64.b64encode(column.tobytes()).decode()
+
+
+def _decode(typecode: str, data: str) -> array:
+    column = array(typecode, base64.b64decode(data))
+    if sys.byteorder != "little":  # pragma: no cover
+        column.byteswap()
+    return column
+
+
+class TankHistory:
+    """
+    Readings of one tank, at most one per reading date, oldest first.
+
+    Readings are kept in parallel typed arrays, a few bytes per reading, and
+    looked up by bisecting the sorted day column.
+    """
+
+    __slots__ = ("_days", "_degree_days", "_fuel", "_price")
+
+    def __init__(self) -> None:
+        """Create an empty history."""
+        self._days = array(_DAY_TYPE)
+        self._fuel = array(_VALUE_TYPE)
+        self._price = array(_VALUE_TYPE)
+        self._degree_days = array(_VALUE_TYPE)
+
+    def __len__(self) -> int:
+        """Return the number of readings."""
+        return len(self._days)
+
+    def _reading(self, index: int) -> Reading:
+        return Reading(
+            day=datetime.date.fromordinal(self._days[index]),
+            fuel_remaining=self._fuel[index],
+            price=_nan_to_none(self._price[index]),
+            degree_days=_nan_to_none(self._degree_days[index]),
+        )
+
+    def add(
+        self,
+        day: datetime.date,
+        fuel_remaining: float,
+        price: float | None,
+        degree_days: float | None = None,
+    ) -> bool:
+        """
+        Add a reading, returning whether the history changed.
+
+        A reading for a day that's already known replaces it, so the portal
+        correcting a reading is kept but seeing the same one again is not.
+        """
+        ordinal = day.toordinal()
+        price = math.nan if price is None else price
+        degree_days = math.nan if degree_days is None else degree_days
+        index = bisect.bisect_left(self._days, ordinal)
+        if index < len(self._days) and self._days[index] == ordinal:
+            if self._fuel[index] == fuel_remaining and _same(self._price[index], price):
+                return False
+            self._fuel[index] = fuel_remaining
+            self._price[index] = price
+            self._degree_days[index] = degree_days
+            return True
+        self._days.insert(index, ordinal)
+        self._fuel.insert(index, fuel_remaining)
+        self._price.insert(index, price)
+        self._degree_days.insert(index, degree_days)
+        return True
+
+    @property
+    def latest(self) -> Reading | None:
+        """Return the most recent reading."""
+        return self._reading(-1) if self._days else None
+
+    def readings(
+        self,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> list[Reading]:
+        """Return the readings from start to end, inclusive, oldest first."""
+        low = 0 if start is None else bisect.bisect_left(self._days, start.toordinal())
+        high = (
+            len(self._days)
+            if end is None
+            else bisect.bisect_right(self._days, end.toordinal())
+        )
+        return [self._reading(index) for index in range(low, high)]
+
+    def as_dict(self) -> dict[str, str]:
+        """Return the history in its stored form."""
+        return {
+            "days": _encode(self._days),
+            "fuel_remaining": _encode(self._fuel),
+            "price": _encode(self._price),
+            "degree_days": _encode(self._degree_days),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, str]) -> TankHistory:
+        """Load a history returned by as_dict."""
+        history = cls()
+        history._days = _decode(_DAY_TYPE, data["days"])
+        history._fuel = _decode(_VALUE_TYPE, data["fuel_remaining"])
+        history._price = _decode(_VALUE_TYPE, data["price"])
+        if "degree_days" in data:
+            history._degree_days = _decode(_VALUE_TYPE, data["degree_days"])
+        else:
+            history._degree_days = array(_VALUE_TYPE, [math.nan]) * len(history)
+        return history
+
+
+class HistoryStore:
+    """
+    The reading history of every tank on an account, loaded on first use.
+
+    Alongside the readings it keeps the account's running degree-day total
+    and burn rate fits, which are updated as readings arrive.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Create the store for a config entry."""
+        self._store: Store[dict] = Store(
+            hass, _STORAGE_VERSION, f"{DOMAIN}/{entry_id}.history"
+        )
+        self._tanks: dict[str, TankHistory] | None = None
+        self._degree_days = DegreeDays()
+        # Burn rate fits by tank id and whether they are per degree-day.
+        self._burn_rates: dict[tuple[str, bool], BurnRate] = {}
+        self._load_lock = asyncio.Lock()
+
+    async def _async_tanks(self) -> dict[str, TankHistory]:
+        async with self._load_lock:
+            if self._tanks is None:
+                data = await self._store.async_load() or {}
+                self._tanks = {
+                    tank_id: TankHistory.from_dict(tank)
+                    for tank_id, tank in data.get("tanks", {}).items()
+                }
+                self._degree_days = DegreeDays.from_dict(data.get("degree_days", {}))
+        return self._tanks
+
+    def _data_to_save(self) -> dict:
+        return {
+            "tanks": {
+                tank_id: history.as_dict()
+                for tank_id, history in (self._tanks or {}).items()
+            },
+            "degree_days": self._degree_days.as_dict(),
+        }
+
+    async def async_sample_temperature(
+        self, when: datetime.datetime, temperature: float
+    ) -> float:
+        """Count degree-days up to a temperature sample, returning the total."""
+        await self._async_tanks()
+        self._degree_days.sample(when, temperature)
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+        return self._degree_days.total
+
+    async def async_burn_rate(self, tank_id: str, *, degree_days: bool) -> BurnRate:
+        """Return the fit of a tank's fuel use per day or per degree-day."""
+        key = (tank_id, degree_days)
+        if (burn_rate := self._burn_rates.get(key)) is None:
+            readings = (await self.async_get(tank_id)).readings()
+            points = (
+                degree_day_points(readings) if degree_days else day_points(readings)
+            )
+            burn_rate = self._burn_rates[key] = BurnRate.from_points(points)
+        return burn_rate
+
+    def _update_burn_rates(
+        self, tank_id: str, reading: Reading, *, appended: bool
+    ) -> None:
+        for degree_days in (False, True):
+            key = (tank_id, degree_days)
+            if (burn_rate := self._burn_rates.get(key)) is None:
+                continue
+            if not appended:
+                # An older reading changed; refit from the history next time.
+                del self._burn_rates[key]
+            elif not degree_days:
+                burn_rate.add(reading.day.toordinal(), reading.fuel_remaining)
+            elif reading.degree_days is not None:
+                burn_rate.add(reading.degree_days, reading.fuel_remaining)
+
+    async def async_get(self, tank_id: str) -> TankHistory:
+        """Return the history of a tank, empty if it has none yet."""
+        return (await self._async_tanks()).get(tank_id) or TankHistory()
+
+    async def async_record(
+        self, tanks: Iterable[TankReading], degree_days: float | None = None
+    ) -> bool:
+        """Add the readings on the tank page, returning whether any were new."""
+        histories = await self._async_tanks()
+        changed = False
+        for tank in tanks:
+            if tank.data_last_read is None or tank.fuel_remaining is None:
+                continue
+            history = histories.setdefault(tank.tank_id, TankHistory())
+            reading = Reading(
+                tank.data_last_read,
+                tank.fuel_remaining,
+                tank.price,
+                degree_days,
+            )
+            count = len(history)
+            if not history.add(*reading):
+                continue
+            changed = True
+            self._update_burn_rates(
+                tank.tank_id,
+                reading,
+                appended=len(history) > count and history.latest.day == reading.day,
+            )
+        if changed:
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+        return changed
+
+    async def async_remove(self) -> None:
+        """Delete the stored history."""
+        await self._store.async_remove()
@@ -0,0 +1,124 @@
+"""Timings and counters for the work done on each poll of the portal."""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import time
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import SimpleNamespace
+
+# Stages of a poll, in the order they happen.
+STAGES = ("dns", "connect", "login", "fetch", "parse", "cookie_save", "update")
+
+
+@dataclasses.dataclass(slots=True)
+class StageTiming:
+    """How long one stage took, last time and over all runs."""
+
+    count: int = 0
+    total: float = 0.0
+    last: float | None = None
+
+    def record(self, duration: float) -> None:
+        """Add a run of the stage."""
+        self.count += 1
+        self.total += duration
+        self.last = duration
+
+
+@dataclasses.dataclass
+class ClientMetrics:
+    """Counters for one portal account."""
+
+    stages: dict[str, StageTiming] = dataclasses.field(
+        default_factory=lambda: {stage: StageTiming() for stage in STAGES}
+    )
+    requests: int = 0
+    bytes_received: int = 0
+    logins: int = 0
+    page_fetches: int = 0
+    unchanged_pages: int = 0
+    # Tank pages parsed by the fast path, by the extractor of a known layout,
+    # and those that needed a tree.
+    fast_parses: int = 0
+    layout_parses: int = 0
+    tree_parses: int = 0
+    failures: int = 0
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the body of the with statement as ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage].record(time.perf_counter() - start)
+
+    @property
+    def cache_hit_rate(self) -> float | None:
+        """Return the share of tank pages that didn't need parsing."""
+        if not self.page_fetches:
+            return None
+        return self.unchanged_pages / self.page_fetches
+
+    def as_dict(self) -> dict:
+        """Return the metrics as plain data."""
+        return {
+            **{
+                field.name: getattr(self, field.name)
+                for field in dataclasses.fields(self)
+                if field.name != "stages"
+            },
+            "cache_hit_rate": self.cache_hit_rate,
+            "stages": {
+                stage: dataclasses.asdict(timing)
+                for stage, timing in self.stages.items()
+            },
+        }
+
+
+def _metrics(trace_config_ctx: SimpleNamespace) -> ClientMetrics | None:
+    if isinstance(ctx := trace_config_ctx.trace_request_ctx, ClientMetrics):
+        return ctx
+    return None
+
+
+def _stage_callbacks(stage: str):  # noqa: ANN202
+    """Return trace callbacks timing ``stage``, which may nest in another."""
+
+    async def on_start(
+        _: aiohttp.ClientSession, trace_config_ctx: SimpleNamespace, __: object
+    ) -> None:
+        setattr(trace_config_ctx, f"{stage}_start", time.perf_counter())
+
+    async def on_end(
+        _: aiohttp.ClientSession, trace_config_ctx: SimpleNamespace, __: object
+    ) -> None:
+        if (metrics := _metrics(trace_config_ctx)) is not None:
+            start = getattr(trace_config_ctx, f"{stage}_start")
+            metrics.stages[stage].record(time.perf_counter() - start)
+
+    return on_start, on_end
+
+
+def trace_config() -> aiohttp.TraceConfig:
+    """
+    Return a trace config timing DNS lookups and new connections.
+
+    Only requests sent with a ClientMetrics as ``trace_request_ctx`` are
+    recorded.
+    """
+    config = aiohttp.TraceConfig()
+    on_start, on_end = _stage_callbacks("dns")
+    config.on_dns_resolvehost_start.append(on_start)
+    config.on_dns_resolvehost_end.append(on_end)
+    on_start, on_end = _stage_callbacks("connect")
+    config.on_connection_create_start.append(on_start)
+    config.on_connection_create_end.append(on_end)
+    return config
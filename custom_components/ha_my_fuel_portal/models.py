@@ -0,0 +1,91 @@
+"""Data scraped from the fuel portal, independent of how it is parsed."""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+from typing import TYPE_CHECKING, Any, TypedDict
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+_DATE_FIELDS = frozenset(("last_delivery", "next_delivery", "data_last_read"))
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class TankReading:
+    """
+    A tank as shown in its box on the tank page.
+
+    ``tank_id`` and ``name`` identify the tank on the account; they are None
+    when only the fields were parsed.
+    """
+
+    tank_id: str | None = None
+    name: str | None = None
+    tank_size: int | None = None
+    fuel_remaining: int | None = None
+    price: float | None = None
+    delivery_mode: str | None = None
+    last_delivery: datetime.date | None = None
+    next_delivery: datetime.date | None = None
+    data_last_read: datetime.date | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return every field by name."""
+        return {name: getattr(self, name) for name in _ALL_FIELDS}
+
+    def as_json(self) -> list:
+        """Return the fields as a compact JSON array, dates as ordinals."""
+        return [
+            None
+            if (value := getattr(self, name)) is None
+            else value.toordinal()
+            if name in _DATE_FIELDS
+            else value
+            for name in _ALL_FIELDS
+        ]
+
+    @classmethod
+    def from_json(cls, data: Sequence) -> TankReading:
+        """Load a reading returned by as_json."""
+        return cls(
+            **{
+                name: datetime.date.fromordinal(value)
+                if value is not None and name in _DATE_FIELDS
+                else value
+                for name, value in zip(_ALL_FIELDS, data, strict=True)
+            }
+        )
+
+    def diff(self, other: TankReading | None) -> frozenset[str]:
+        """Return the names of the fields that differ from another reading."""
+        if other is None:
+            return _ALL_FIELD_SET
+        if other == self:
+            return frozenset()
+        return frozenset(
+            name for name in _ALL_FIELDS if getattr(self, name) != getattr(other, name)
+        )
+
+
+_ALL_FIELDS = tuple(field.name for field in dataclasses.fields(TankReading))
+_ALL_FIELD_SET = frozenset(_ALL_FIELDS)
+
+
+@dataclasses.dataclass
+class LoginForm:
+    """A login form scraped from the portal, ready to be submitted."""
+
+    action: str
+    method: str
+    fields: dict[str, str]
+
+
+class HistoryRecord(TypedDict):
+    """A row of a delivery or reading history table."""
+
+    tank_id: str | None
+    date: datetime.date
+    gallons: float | None
+    price: float | None
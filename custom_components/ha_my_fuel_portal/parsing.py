@@ -1,11 +1,28 @@
 """Routines for HTML parsing of the fuel portal site."""
 
+from __future__ import annotations
+
 import contextlib
+import dataclasses
 import datetime
+import hashlib
+import html
 import re
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 import bs4
 
+from .models import HistoryRecord, LoginForm, TankReading
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover
+    etree = lxml_html = None
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+
 _TANK_SIZE_RE = re.compile(r"(\d+)\ gal\.")
 _TANK_REMAINING_RE = re.compile(r"(\d+)\ gallons\ in\ tank")
 _PRICE_RE = re.compile(r"\$.*")
@@ -19,58 +36,811 @@ _DATA_LAST_READ_DATE_RE = re.compile(
     r"Reading\ Date:\s*(\d{1,2}/\d{1,2}/\d{4})", re.MULTILINE
 )
 
+_DELIVERY_LINK_RE = re.compile(r"/RequestADelivery/Index/(\w+)")
+# Text only found in a box holding a tank, unlike the portal's other boxes.
+_TANK_LABEL_RE = re.compile(
+    r"\d+\ gal\.|gallons\ in\ tank|Last\ Delivery:|Estimated\ Next\ Delivery:"
+    r"|Reading\ Date:"
+)
 
-def _get_numeric_regex(page: bs4.BeautifulSoup, pattern: re.Pattern) -> int | None:
-    str_value = page.find(string=pattern)
-    if not str_value:
-        return None
-    match = pattern.search(str_value)
-    if not match:
-        return None
+_DELIVERY_MODES = ("Monitored", "Automatic")
+
+_DATE_RE = re.compile(r"(\d{1,2}/\d{1,2}/\d{4})")
+_NUMBER_RE = re.compile(r"([\d,]+(?:\.\d+)?)")
+_PAGE_RE = re.compile(r"[?&]page=(\d+)", re.IGNORECASE)
+
+
+def _match_to_int(match: re.Match) -> int | None:
     with contextlib.suppress(ValueError):
         return int(match.group(1))
     return None
 
 
-def _get_price(page: bs4.BeautifulSoup) -> float | None:
-    price_element = page.find("span", string=_PRICE_RE)
-    if not price_element:
-        return None
+def _match_to_date(match: re.Match) -> datetime.date | None:
     with contextlib.suppress(ValueError):
-        return float(price_element.text.lstrip("$"))
+        return datetime.datetime.strptime(match.group(1), "%m/%d/%Y").date()
     return None
 
 
-def _get_delivery_mode(page: bs4.BeautifulSoup) -> str | None:
-    mode_element = page.find("div", class_="text-2")
-    if not mode_element or mode_element.text not in ("Monitored", "Automatic"):
+# Fields taken from the first text node in the box matching their pattern.
+_TEXT_FIELDS: tuple[tuple[str, re.Pattern, Callable[[re.Match], Any]], ...] = (
+    ("tank_size", _TANK_SIZE_RE, _match_to_int),
+    ("fuel_remaining", _TANK_REMAINING_RE, _match_to_int),
+    ("last_delivery", _LAST_DELIVERY_DATE_RE, _match_to_date),
+    ("next_delivery", _NEXT_DELIVERY_DATE_RE, _match_to_date),
+    ("data_last_read", _DATA_LAST_READ_DATE_RE, _match_to_date),
+)
+_FIELD_NAMES = (
+    "tank_size",
+    "fuel_remaining",
+    "price",
+    "delivery_mode",
+    "last_delivery",
+    "next_delivery",
+    "data_last_read",
+)
+
+
+class _TankFieldCollector:
+    """
+    Resolve tank fields from a single document-order walk over a box.
+
+    Each field is resolved by the first node that can provide it, the same
+    node a ``find()`` for that field would return, so the walk can stop as
+    soon as every field is resolved. With ``identify`` the tank's id and name
+    are resolved as well.
+    """
+
+    __slots__ = ("_fields", "_identify", "_pending_text_fields")
+
+    def __init__(self, *, identify: bool = False) -> None:
+        self._fields: dict[str, Any] = {}
+        self._identify = identify
+        self._pending_text_fields = list(_TEXT_FIELDS)
+
+    def __len__(self) -> int:
+        """Return the number of fields resolved so far."""
+        return len(self._fields)
+
+    @property
+    def done(self) -> bool:
+        """Return whether every field has been resolved."""
+        wanted = len(_FIELD_NAMES) + (2 if self._identify else 0)
+        return len(self._fields) == wanted
+
+    @property
+    def wants_span(self) -> bool:
+        """Return whether a span could still resolve a field."""
+        return "price" not in self._fields or (
+            self._identify and "name" not in self._fields
+        )
+
+    @property
+    def wants_delivery_mode(self) -> bool:
+        """Return whether the delivery mode is still unresolved."""
+        return "delivery_mode" not in self._fields
+
+    @property
+    def wants_link(self) -> bool:
+        """Return whether the tank id is still unresolved."""
+        return self._identify and "tank_id" not in self._fields
+
+    def feed_string(self, text: str) -> None:
+        """Resolve any pending fields whose pattern matches a text node."""
+        pending = self._pending_text_fields
+        for index in range(len(pending) - 1, -1, -1):
+            name, pattern, convert = pending[index]
+            match = pattern.search(text)
+            if match:
+                self._fields[name] = convert(match)
+                del pending[index]
+
+    def feed_span(
+        self,
+        classes: Sequence[str],
+        string: str | None,
+        get_text: Callable[[], str],
+    ) -> None:
+        """Resolve the price, or the tank name, from a span."""
+        if self._identify and "name" not in self._fields and "text-larger" in classes:
+            self._fields["name"] = " ".join(get_text().split()) or None
+        if "price" in self._fields or string is None or not _PRICE_RE.search(string):
+            return
+        self._fields["price"] = None
+        with contextlib.suppress(ValueError):
+            self._fields["price"] = float(get_text().lstrip("$"))
+
+    def feed_div(self, classes: Sequence[str], get_text: Callable[[], str]) -> None:
+        """Resolve the delivery mode from the first ``text-2`` div."""
+        if "text-2" not in classes:
+            return
+        text = str(get_text())
+        self._fields["delivery_mode"] = text if text in _DELIVERY_MODES else None
+
+    def feed_link(self, href: str | None) -> None:
+        """Resolve the tank id from its delivery request link."""
+        if href and (match := _DELIVERY_LINK_RE.search(href)):
+            self._fields["tank_id"] = match.group(1)
+
+    def resolved(self, names: Iterable[str]) -> bool:
+        """Return whether every named field was found, with a value."""
+        return all(self._fields.get(name) is not None for name in names)
+
+    def result(self) -> TankReading:
+        """Return the tank fields, with unresolved ones set to None."""
+        fields = self._fields
+        return TankReading(**{name: fields.get(name) for name in _FIELD_NAMES})
+
+    def tank(self, index: int) -> TankReading:
+        """Return the identified tank, falling back to its position for an id."""
+        fields = self._fields
+        name = fields.get("name")
+        return TankReading(
+            tank_id=fields.get("tank_id") or name or str(index),
+            name=name,
+            **{field: fields.get(field) for field in _FIELD_NAMES},
+        )
+
+
+def make_soup(
+    html: str | bytes,
+    *,
+    only_tank_box: bool = False,
+    features: str | None = None,
+) -> bs4.BeautifulSoup:
+    """
+    Build a soup from a portal page.
+
+    With ``only_tank_box`` the tree is limited to the tank ``box-body`` div,
+    so the rest of the page is never materialized.
+    """
+    return bs4.BeautifulSoup(
+        html,
+        features=features or _DEFAULT_SOUP_FEATURES,
+        parse_only=bs4.SoupStrainer("div", class_="box-body")
+        if only_tank_box
+        else None,
+    )
+
+
+def _walk_soup(box: bs4.Tag, collector: _TankFieldCollector) -> None:
+    for node in box.descendants:
+        if isinstance(node, bs4.NavigableString):
+            collector.feed_string(node)
+        elif node.name == "span":
+            if collector.wants_span:
+                collector.feed_span(node.get("class", ()), node.string, node.get_text)
+        elif node.name == "div":
+            if collector.wants_delivery_mode:
+                collector.feed_div(node.get("class", ()), node.get_text)
+        elif node.name == "a":
+            if collector.wants_link:
+                collector.feed_link(node.get("href"))
+        else:
+            continue
+        if collector.done:
+            break
+
+
+def _soup_holds_tank(box: bs4.Tag) -> bool:
+    return (
+        box.find("a", href=_DELIVERY_LINK_RE) is not None
+        or box.find(string=_TANK_LABEL_RE) is not None
+    )
+
+
+def _soup_tank_elements(page: bs4.BeautifulSoup) -> list[bs4.Tag]:
+    """Return the element holding each tank, in page order."""
+    elements = []
+    for box in page.find_all("div", class_="box-body"):
+        if rows := box.find_all("div", class_="tank-row"):
+            elements.extend(rows)
+        elif _soup_holds_tank(box):
+            elements.append(box)
+    return elements
+
+
+def parse_tank(page: bs4.BeautifulSoup) -> TankReading:
+    """Parse the page to extract info about a tank."""
+    collector = _TankFieldCollector()
+    _walk_soup(page.find("div", class_="box-body"), collector)
+    return collector.result()
+
+
+def _lxml_string(element: lxml_html.HtmlElement) -> str | None:
+    """Return what ``Tag.string`` would for the element."""
+    while True:
+        if len(element) == 0:
+            return element.text
+        if len(element) > 1 or element.text or element[0].tail:
+            return None
+        element = element[0]
+
+
+def _feed_lxml_element(
+    element: lxml_html.HtmlElement, collector: _TankFieldCollector
+) -> None:
+    if element.tag == "span":
+        if collector.wants_span:
+            collector.feed_span(
+                element.get("class", "").split(),
+                _lxml_string(element),
+                element.text_content,
+            )
+    elif element.tag == "div":
+        if collector.wants_delivery_mode:
+            collector.feed_div(element.get("class", "").split(), element.text_content)
+    elif element.tag == "a" and collector.wants_link:
+        collector.feed_link(element.get("href"))
+    if element.text:
+        collector.feed_string(element.text)
+
+
+def _walk_lxml(box: lxml_html.HtmlElement, collector: _TankFieldCollector) -> None:
+    for event, element in etree.iterwalk(box, events=("start", "end", "comment")):
+        if event == "end":
+            if element is not box and element.tail:
+                collector.feed_string(element.tail)
+        elif event == "comment":
+            for text in (element.text, element.tail):
+                if text:
+                    collector.feed_string(text)
+        else:
+            _feed_lxml_element(element, collector)
+        if collector.done:
+            break
+
+
+def _lxml_has_class(element: lxml_html.HtmlElement, name: str) -> bool:
+    return name in element.get("class", "").split()
+
+
+def _lxml_holds_tank(box: lxml_html.HtmlElement) -> bool:
+    return any(
+        _DELIVERY_LINK_RE.search(link.get("href", "")) for link in box.iter("a")
+    ) or bool(_TANK_LABEL_RE.search(box.text_content()))
+
+
+def _lxml_tank_elements(box: lxml_html.HtmlElement) -> list[lxml_html.HtmlElement]:
+    """Return the element holding each tank in a box, in page order."""
+    rows = [
+        row
+        for row in box.iter("div")
+        if row is not box and _lxml_has_class(row, "tank-row")
+    ]
+    if rows:
+        return rows
+    return [box] if _lxml_holds_tank(box) else []
+
+
+def _lxml_tanks(elements: Iterable[lxml_html.HtmlElement]) -> list[TankReading]:
+    tanks = []
+    for index, element in enumerate(elements):
+        collector = _TankFieldCollector(identify=True)
+        _walk_lxml(element, collector)
+        tanks.append(collector.tank(index))
+    return tanks
+
+
+def _parse_tanks_lxml(html: str | bytes) -> list[TankReading]:
+    try:
+        root = lxml_html.document_fromstring(html)
+    except etree.ParserError:
+        return []
+    return _lxml_tanks(
+        element
+        for box in root.iter("div")
+        if _lxml_has_class(box, "box-body")
+        for element in _lxml_tank_elements(box)
+    )
+
+
+# One pattern splitting a tank box into the tokens the collector looks at,
+# for the fast path: comments, span, div and link tags (with their text, when
+# that's all they hold), closing divs, any other tag, and text. Scripts,
+# styles and stray "<" aren't handled; they need the tree.
+_FAST_TOKEN_RE = re.compile(
+    r"<!--(?P<comment>.*?)-->"
+    r"|<(?P<tag>span|div|a)\b(?P<attrs>[^>]*)>(?:(?P<string>[^<]*)</(?P=tag)\s*>)?"
+    r"|<(?P<raw>script|style)\b"
+    r"|</(?P<close>div)\s*>"
+    r"|</?[a-zA-Z][^>]*>"
+    r"|(?P<text>[^<]+)"
+    r"|(?P<stray><)",
+    re.DOTALL,
+)
+_FAST_CLASS_RE = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_FAST_HREF_RE = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_FAST_TANK_ROW_RE = re.compile(r"""<div\b[^>]*\bclass\s*=\s*["'][^"']*\btank-row\b""")
+# Fields the fast path must find for its result to be trusted. The dates are
+# left out, as the portal only shows them when there are any; a date must be
+# found when its label is in the box.
+_FAST_REQUIRED_FIELDS = (
+    "tank_id",
+    "name",
+    "tank_size",
+    "fuel_remaining",
+    "price",
+    "delivery_mode",
+)
+_DATE_LABELS = {
+    "last_delivery": "Last Delivery:",
+    "next_delivery": "Estimated Next Delivery:",
+    "data_last_read": "Reading Date:",
+}
+# Box start and div tags, found in the raw bytes of a page.
+_BOX_START_RE = re.compile(rb"<div\b[^>]*\bbox-body\b[^>]*>")
+_DIV_TAG_RE = re.compile(rb"<(/?)div\b[^>]*>")
+# Bytes kept while looking for a box, in case its start tag is split.
+_MAX_START_TAG = 512
+# Bytes after the last box closed past which the page is taken to hold no
+# more boxes; what follows the content (a footer, scripts) is usually small.
+_MAX_TAIL = 64 * 1024
+
+FAST_PATH = "fast"
+LAYOUT_PATH = "layout"
+TREE_PATH = "tree"
+
+# The tags of a box, with their classes, which make up its layout. Text and
+# other attributes vary between tanks and readings, so they're left out.
+_FINGERPRINT_RE = re.compile(
+    r"""<(!--|/?[a-zA-Z][\w-]*)(?:[^>]*?\bclass\s*=\s*["']([^"']*)|[^>]*)"""
+)
+# Layouts kept by a parser cache; a portal only renders a few.
+_MAX_LAYOUTS = 8
+
+
+def _fast_attribute(pattern: re.Pattern, attrs: str) -> str | None:
+    if (match := pattern.search(attrs)) is None:
         return None
-    return mode_element.text
+    return html.unescape(match.group(1) if match.group(1) is not None else match[2])
+
+
+def _feed_fast_tag(
+    collector: _TankFieldCollector, tag: str, attrs: str, string: str | None
+) -> bool:
+    """Feed a tag to the collector, returning False if it needs the tree."""
+    nested = string is None
+    text = "" if nested else html.unescape(string)
+    classes = (_fast_attribute(_FAST_CLASS_RE, attrs) or "").split()
+    if tag == "span":
+        if collector.wants_span:
+            if nested:
+                return False
+            collector.feed_span(classes, text or None, lambda: text)
+    elif tag == "div":
+        if collector.wants_delivery_mode and "text-2" in classes:
+            if nested:
+                return False
+            collector.feed_div(classes, lambda: text)
+    elif collector.wants_link:
+        collector.feed_link(_fast_attribute(_FAST_HREF_RE, attrs))
+    if text:
+        collector.feed_string(text)
+    return True
+
+
+def _fast_complete(collector: _TankFieldCollector, box: str) -> bool:
+    """Return whether the fast path found every field the tree would."""
+    return collector.resolved(_FAST_REQUIRED_FIELDS) and all(
+        label not in box
+        for name, label in _DATE_LABELS.items()
+        if not collector.resolved((name,))
+    )
+
+
+class _LayoutSlot(NamedTuple):
+    """A token of a layout fed to the collector, captured by its pattern."""
+
+    kind: str
+    tag: str | None = None
+    nested: bool = False
+
+
+def _token_pattern(match: re.Match, *, capture: bool) -> str | None:
+    """Return a pattern for tokens like the match, or None if there is none."""
+    group = "(" if capture else "(?:"
+    if match["comment"] is not None:
+        return f"<!--{group}.*?)-->"
+    if (tag := match["tag"]) is not None:
+        pattern = rf"<{tag}\b{group}[^>]*)>"
+        if match["string"] is not None:
+            pattern += rf"{group}[^<]*)</{tag}\s*>"
+        return pattern
+    if match["close"] is not None:
+        return r"</div\s*>"
+    if match["text"] is not None:
+        return f"{group}[^<]*)"
+    if match["raw"] is not None or match["stray"] is not None:
+        return None
+    return r"</?[a-zA-Z][^>]*>"
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Layout:
+    """
+    An extractor specialized for one layout of the tank box.
+
+    ``pattern`` matches a box of the layout from its start up to where the
+    fast path stopped walking it, capturing every token the walk fed to the
+    collector, so extracting the tank takes one match, and any field another
+    box of the layout has in a different place (a date shown only sometimes)
+    is still found. A layout without a pattern is one that needs the tree.
+    """
+
+    pattern: re.Pattern | None
+    slots: tuple[_LayoutSlot, ...] = ()
+
+    def extract(self, box: str) -> TankReading | None:
+        """Extract the tank in a box of this layout, None if it needs the tree."""
+        if self.pattern is None or (match := self.pattern.match(box)) is None:
+            return None
+        collector = _TankFieldCollector(identify=True)
+        values = iter(match.groups())
+        for slot in self.slots:
+            value = next(values)
+            if slot.kind == "tag":
+                string = None if slot.nested else next(values)
+                if not _feed_fast_tag(collector, slot.tag, value, string):
+                    return None
+            elif slot.kind == "text":
+                collector.feed_string(html.unescape(value))
+            else:
+                collector.feed_string(value)
+        if not _fast_complete(collector, box):
+            return None
+        return collector.tank(0)
+
+
+_TREE_LAYOUT = Layout(pattern=None)
+
+
+def _compile_layout(tokens: Iterable[tuple[re.Match, bool]]) -> Layout | None:
+    """Compile the layout of the tokens walked, and whether each was fed."""
+    pieces = []
+    slots = []
+    end = 0
+    for match, fed in tokens:
+        if (piece := _token_pattern(match, capture=fed)) is None:
+            return None
+        pieces.append(piece)
+        if not fed:
+            continue
+        end = len(pieces)
+        if (tag := match["tag"]) is not None:
+            slots.append(_LayoutSlot("tag", tag, nested=match["string"] is None))
+        else:
+            slots.append(
+                _LayoutSlot("text" if match["text"] is not None else "comment")
+            )
+    return Layout(re.compile("".join(pieces[:end]), re.DOTALL), tuple(slots))
+
+
+def _feed_fast_token(collector: _TankFieldCollector, match: re.Match) -> bool | None:
+    """Feed a token to the collector, returning whether it could hold a field."""
+    if (text := match["text"]) is not None:
+        collector.feed_string(html.unescape(text))
+    elif (text := match["comment"]) is not None:
+        collector.feed_string(text)
+    elif (tag := match["tag"]) is not None:
+        if not _feed_fast_tag(collector, tag, match["attrs"], match["string"]):
+            return None
+    elif match["raw"] is not None or match["stray"] is not None:
+        return None
+    else:
+        return False
+    return True
+
+
+def _extract_fast(
+    box: str, *, learn: bool = False
+) -> tuple[TankReading | None, Layout | None]:
+    """
+    Extract the tank in a box, and with ``learn`` the layout of the box.
+
+    The layout is None when it's still unknown, because a field was missing
+    or markup before the tank can't be matched.
+    """
+    rows = [match.start() for match in _FAST_TANK_ROW_RE.finditer(box)]
+    if len(rows) > 1:
+        return None, _TREE_LAYOUT
+    start = rows[0] if rows else 0
+    collector = _TankFieldCollector(identify=True)
+    # The tokens walked, and whether each was fed, to learn from.
+    tokens: list[tuple[re.Match, bool]] = []
+    # Divs open within the tank's element; the walk ends when it closes.
+    depth = 0
+    for match in _FAST_TOKEN_RE.finditer(box, 0 if learn else start):
+        if match.start() < start:
+            tokens.append((match, False))
+            continue
+        if match["tag"] == "div" and match["string"] is None:
+            depth += 1
+        elif match["close"] is not None:
+            depth -= 1
+            if depth == 0:
+                break
+        if (fed := _feed_fast_token(collector, match)) is None:
+            return None, _TREE_LAYOUT
+        if learn:
+            tokens.append((match, fed))
+        if collector.done:
+            break
+    if not _fast_complete(collector, box):
+        return None, None
+    return collector.tank(0), _compile_layout(tokens) if learn else None
+
+
+def extract_tank(box: str) -> TankReading | None:
+    """
+    Extract the tank in a box with one pattern over its text, without a tree.
+
+    Returns None when the tree is needed: for a box holding several tanks,
+    markup the pattern can't follow, or a missing field (a date only counts
+    as missing when its label is there).
+    """
+    return _extract_fast(box)[0]
+
+
+class TankPageParser:
+    """
+    Parse the tanks on a tank page incrementally, as its body arrives.
+
+    Each ``box-body`` div is found in the raw bytes by counting div tags,
+    without building a tree, and only the boxes' bytes are kept, so memory
+    use is bounded by the chunk size and the boxes. ``digest`` tells whether
+    the boxes are those of an earlier page. Once more than ``_MAX_TAIL``
+    bytes have followed the last box, ``done`` is set and the rest of the
+    page needn't be fed.
 
+    On closing, boxes without a tank (the portal has other boxes too) are
+    dropped, and a single tank box is extracted by ``extract_tank`` (the fast
+    path), falling back to parsing a tree of the boxes when that can't be
+    trusted, or when there are several; ``path`` tells which was used.
 
-def _get_date_regex(
-    page: bs4.BeautifulSoup, pattern: re.Pattern
-) -> datetime.date | None:
-    date_str = page.find(string=pattern)
-    if not date_str:
+    Given a ``layouts`` cache, the box's tags are looked up in it first, and
+    a box of a known layout is extracted by the layout's own pattern (the
+    layout path), or straight from the tree if the layout needs it. A new
+    layout is learned from the fast path, the first time it's seen.
+    """
+
+    def __init__(
+        self,
+        encoding: str = "utf-8",
+        layouts: dict[tuple, Layout] | None = None,
+    ) -> None:
+        """Create a parser for a body in ``encoding``."""
+        self._encoding = encoding
+        self._layouts = layouts
+        self._buffer = bytearray()
+        self._in_box = False
+        self._depth = 0
+        self._scanned = 0
+        self._boxes: list[bytes] = []
+        # Bytes dropped since the last box closed.
+        self._tail = 0
+        self._tanks: list[TankReading] | None = None
+        self.path: str | None = None
+
+    @property
+    def done(self) -> bool:
+        """Return whether the page is past its last box."""
+        return self._tail > _MAX_TAIL
+
+    @property
+    def digest(self) -> bytes:
+        """Return a digest of the boxes fed so far."""
+        digest = hashlib.blake2b(digest_size=16)
+        for box in self._boxes:
+            digest.update(box)
+        if self._in_box:
+            digest.update(self._buffer)
+        return digest.digest()
+
+    def feed(self, data: bytes) -> None:
+        """Scan the next chunk of the page."""
+        buffer = self._buffer
+        buffer += data
+        while True:
+            if not self._in_box:
+                if (match := _BOX_START_RE.search(buffer)) is None:
+                    if self._boxes:
+                        self._tail += max(len(buffer) - _MAX_START_TAG, 0)
+                    del buffer[:-_MAX_START_TAG]
+                    return
+                del buffer[: match.start()]
+                self._in_box = True
+                self._depth = 0
+                self._scanned = 0
+            for match in _DIV_TAG_RE.finditer(buffer, self._scanned):
+                self._scanned = match.end()
+                self._depth += -1 if match.group(1) else 1
+                if self._depth == 0:
+                    break
+            else:
+                return
+            self._boxes.append(bytes(buffer[: self._scanned]))
+            del buffer[: self._scanned]
+            self._in_box = False
+            self._tail = 0
+
+    def _extract(self, box: str) -> TankReading | None:
+        layouts = self._layouts
+        if layouts is None:
+            self.path = FAST_PATH
+            return extract_tank(box)
+        fingerprint = tuple(_FINGERPRINT_RE.findall(box))
+        if (layout := layouts.get(fingerprint)) is not None:
+            self.path = LAYOUT_PATH
+            return layout.extract(box)
+        self.path = FAST_PATH
+        tank, layout = _extract_fast(box, learn=True)
+        if layout is not None:
+            if len(layouts) >= _MAX_LAYOUTS:
+                del layouts[next(iter(layouts))]
+            layouts[fingerprint] = layout
+        return tank
+
+    def close(self) -> list[TankReading]:
+        """Return the tanks, from however many of the boxes were fed."""
+        if self._tanks is not None:
+            return self._tanks
+        boxes = [*self._boxes, bytes(self._buffer)] if self._in_box else self._boxes
+        texts = [box.decode(self._encoding, errors="replace") for box in boxes]
+        tank_boxes = [
+            text
+            for text in texts
+            if _DELIVERY_LINK_RE.search(text) or _TANK_LABEL_RE.search(text)
+        ]
+        if not tank_boxes:
+            self._tanks = []
+        elif (
+            len(tank_boxes) == 1 and (tank := self._extract(tank_boxes[0])) is not None
+        ):
+            self._tanks = [tank]
+        else:
+            self.path = TREE_PATH
+            self._tanks = parse_tanks_html("".join(tank_boxes))
+        return self._tanks
+
+
+def _parse_tanks_stream(html: str | bytes) -> list[TankReading]:
+    parser = TankPageParser()
+    parser.feed(html.encode() if isinstance(html, str) else html)
+    return parser.close()
+
+
+def _soup_backend(features: str) -> Callable[[str | bytes], list[TankReading]]:
+    def _parse_tanks(html: str | bytes) -> list[TankReading]:
+        page = make_soup(html, only_tank_box=True, features=features)
+        tanks = []
+        for index, element in enumerate(_soup_tank_elements(page)):
+            collector = _TankFieldCollector(identify=True)
+            _walk_soup(element, collector)
+            tanks.append(collector.tank(index))
+        return tanks
+
+    return _parse_tanks
+
+
+# Parser backends by name, fastest first. Each takes the raw page and
+# returns every tank on it, which is empty when the page has no tank box.
+BACKENDS: dict[str, Callable[[str | bytes], list[TankReading]]] = {}
+if lxml_html is not None:
+    BACKENDS["lxml"] = _parse_tanks_lxml
+    BACKENDS["bs4-lxml"] = _soup_backend("lxml")
+BACKENDS["bs4-html.parser"] = _soup_backend("html.parser")
+# Scans for the boxes without a tree, for when the page arrives in chunks.
+BACKENDS["stream"] = _parse_tanks_stream
+
+DEFAULT_BACKEND = next(iter(BACKENDS))
+_DEFAULT_SOUP_FEATURES = "lxml" if lxml_html is not None else "html.parser"
+
+
+def parse_tanks_html(
+    html: str | bytes, backend: str | None = None
+) -> list[TankReading]:
+    """
+    Parse every tank on a raw tank page.
+
+    Uses the given backend, or the fastest one available. Each ``tank-row``
+    in a ``box-body`` is a tank; a box without rows is a single tank, if it
+    has a delivery link or tank labels (the portal has other boxes too).
+    """
+    return BACKENDS[backend or DEFAULT_BACKEND](html)
+
+
+def _is_submitted_input(element: bs4.Tag) -> bool:
+    if not element.get("name"):
+        return False
+    input_type = element.get("type", "text").lower()
+    if input_type in ("submit", "button", "image", "reset", "file"):
+        return False
+    if input_type in ("checkbox", "radio"):
+        return element.has_attr("checked")
+    return True
+
+
+def _default_input_value(element: bs4.Tag) -> str:
+    return "on" if element.get("type", "").lower() == "checkbox" else ""
+
+
+def parse_login_form(page: bs4.BeautifulSoup) -> LoginForm | None:
+    """Parse the first form on the page, including its hidden inputs."""
+    form = page.find("form")
+    if form is None:
         return None
-    match = pattern.search(date_str)
-    if not match:
+    fields = {
+        element["name"]: element.get("value", _default_input_value(element))
+        for element in form.find_all("input")
+        if _is_submitted_input(element)
+    }
+    return LoginForm(
+        action=form.get("action", ""),
+        method=form.get("method", "post").lower(),
+        fields=fields,
+    )
+
+
+def _match_to_float(match: re.Match | None) -> float | None:
+    if match is None:
         return None
     with contextlib.suppress(ValueError):
-        return datetime.datetime.strptime(match.group(1), "%m/%d/%Y").date()
+        return float(match.group(1).replace(",", ""))
     return None
 
 
-def parse_tank(page: bs4.BeautifulSoup) -> dict:
-    """Parse the page to extract info about a tank."""
-    box = page.find("div", class_="box-body")
-    return {
-        "tank_size": _get_numeric_regex(box, _TANK_SIZE_RE),
-        "fuel_remaining": _get_numeric_regex(box, _TANK_REMAINING_RE),
-        "price": _get_price(box),
-        "delivery_mode": _get_delivery_mode(box),
-        "last_delivery": _get_date_regex(box, _LAST_DELIVERY_DATE_RE),
-        "next_delivery": _get_date_regex(box, _NEXT_DELIVERY_DATE_RE),
-        "data_last_read": _get_date_regex(box, _DATA_LAST_READ_DATE_RE),
-    }
+# History table columns, by the first word of their header.
+_HISTORY_COLUMNS = {
+    "tank": "tank_id",
+    "date": "date",
+    "gallons": "gallons",
+    "quantity": "gallons",
+    "price": "price",
+}
+
+
+def parse_history_page(
+    page: bs4.BeautifulSoup,
+) -> tuple[list[HistoryRecord], int]:
+    """
+    Parse a page of a history table and the number of pages it spans.
+
+    Columns are recognized by their headers; rows without a date are
+    skipped. The page count is the highest ``page=`` link on the page.
+    """
+    records: list[HistoryRecord] = []
+    if (table := page.find("table")) is not None:
+        headers = [
+            _HISTORY_COLUMNS.get(header.get_text(" ", strip=True).split(" ")[0].lower())
+            for header in table.find_all("th")
+        ]
+        for row in table.find_all("tr"):
+            cells = dict(
+                zip(
+                    headers,
+                    (cell.get_text(" ", strip=True) for cell in row.find_all("td")),
+                    strict=False,
+                )
+            )
+            if (match := _DATE_RE.search(cells.get("date") or "")) is None or (
+                day := _match_to_date(match)
+            ) is None:
+                continue
+            records.append(
+                HistoryRecord(
+                    tank_id=cells.get("tank_id") or None,
+                    date=day,
+                    gallons=_match_to_float(
+                        _NUMBER_RE.search(cells.get("gallons", ""))
+                    ),
+                    price=_match_to_float(_NUMBER_RE.search(cells.get("price", ""))),
+                )
+            )
+
+    pages = [
+        int(match.group(1))
+        for link in page.find_all("a", href=True)
+        if (match := _PAGE_RE.search(link["href"])) is not None
+    ]
+    return records, max(pages, default=1)
@@ -0,0 +1,85 @@
+"""Adaptive polling schedule for ha_my_fuel_portal."""
+
+from __future__ import annotations
+
+import datetime
+import statistics
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from .models import TankReading
+
+MIN_INTERVAL = datetime.timedelta(minutes=30)
+DEFAULT_INTERVAL = datetime.timedelta(hours=1)
+MAX_INTERVAL = datetime.timedelta(hours=12)
+
+# How far either side of the usual update time to poll aggressively.
+_WINDOW = datetime.timedelta(hours=1)
+# Observed changes needed before trusting the usual update time.
+_MIN_OBSERVATIONS = 3
+
+
+def _clamp(
+    interval: datetime.timedelta,
+    lower: datetime.timedelta = MIN_INTERVAL,
+    upper: datetime.timedelta = MAX_INTERVAL,
+) -> datetime.timedelta:
+    return max(lower, min(upper, interval))
+
+
+def usual_update_time(changes: Sequence[datetime.datetime]) -> datetime.time | None:
+    """Return the time of day the portal usually publishes new data."""
+    if len(changes) < _MIN_OBSERVATIONS:
+        return None
+    minutes = statistics.median_low(
+        change.hour * 60 + change.minute for change in changes
+    )
+    return datetime.time(hour=minutes // 60, minute=minutes % 60)
+
+
+def next_update_interval(
+    tanks: Iterable[TankReading],
+    changes: Sequence[datetime.datetime],
+    now: datetime.datetime,
+) -> datetime.timedelta:
+    """
+    Return how long to wait before polling the portal again.
+
+    ``changes`` holds the local times at which the tank data was seen to
+    change, oldest first. Polls are frequent around a due delivery and around
+    the time of day the portal usually updates, and back off once today's
+    update has been seen.
+    """
+    today = now.date()
+    tanks = list(tanks)
+
+    # A delivery is due, so the level could change at any time.
+    if any(
+        tank.next_delivery is not None and tank.next_delivery <= today for tank in tanks
+    ):
+        return MIN_INTERVAL
+
+    updated_today = bool(changes) and changes[-1].date() == today
+    read_today = bool(tanks) and all(tank.data_last_read == today for tank in tanks)
+
+    usual = usual_update_time(changes)
+    if usual is None:
+        if not (updated_today or read_today):
+            return DEFAULT_INTERVAL
+        # Nothing new is expected until tomorrow.
+        midnight = datetime.datetime.combine(
+            today + datetime.timedelta(days=1), datetime.time(), now.tzinfo
+        )
+        return _clamp(midnight - now, lower=DEFAULT_INTERVAL)
+
+    window_start = datetime.datetime.combine(today, usual, now.tzinfo) - _WINDOW
+    if updated_today or read_today:
+        window_start += datetime.timedelta(days=1)
+    elif window_start <= now <= window_start + 2 * _WINDOW:
+        return MIN_INTERVAL
+    elif now > window_start:
+        # The update is late today; keep checking at the normal pace.
+        return DEFAULT_INTERVAL
+    return _clamp(window_start - now)
@@ -2,24 +2,175 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
-from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    CURRENCY_DOLLAR,
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+    UnitOfVolume,
+)
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .entity import MyFuelPortalEntity
+from .const import SIGNAL_METRICS_UPDATED
+from .entity import MyFuelPortalEntity, MyFuelPortalTankEntity
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import date
+
     from homeassistant.core import HomeAssistant
     from homeassistant.helpers.entity_platform import AddEntitiesCallback
+    from homeassistant.helpers.typing import StateType
 
     from .coordinator import MyFuelPortalDataUpdateCoordinator
     from .data import MyFuelPortalConfigEntry
+    from .metrics import ClientMetrics
 
 ENTITY_DESCRIPTIONS = (
     SensorEntityDescription(
-        key="ha_my_fuel_portal",
-        name="Integration Sensor",
-        icon="mdi:format-quote-close",
+        key="tank_size",
+        name="Tank size",
+        icon="mdi:propane-tank",
+        device_class=SensorDeviceClass.VOLUME_STORAGE,
+        native_unit_of_measurement=UnitOfVolume.GALLONS,
+    ),
+    # Fuel remaining and price have no state class: their readings are
+    # imported as external statistics, which the recorder would otherwise
+    # duplicate from the states.
+    SensorEntityDescription(
+        key="fuel_remaining",
+        name="Fuel remaining",
+        icon="mdi:propane-tank",
+        device_class=SensorDeviceClass.VOLUME_STORAGE,
+        native_unit_of_measurement=UnitOfVolume.GALLONS,
+    ),
+    SensorEntityDescription(
+        key="price",
+        name="Fuel price",
+        icon="mdi:currency-usd",
+        native_unit_of_measurement=f"{CURRENCY_DOLLAR}/{UnitOfVolume.GALLONS}",
+    ),
+    SensorEntityDescription(
+        key="delivery_mode",
+        name="Delivery mode",
+        icon="mdi:truck",
+        device_class=SensorDeviceClass.ENUM,
+        options=["Monitored", "Automatic"],
+    ),
+    SensorEntityDescription(
+        key="last_delivery",
+        name="Last delivery",
+        icon="mdi:truck-check",
+        device_class=SensorDeviceClass.DATE,
+    ),
+    SensorEntityDescription(
+        key="next_delivery",
+        name="Next delivery",
+        icon="mdi:truck-fast",
+        device_class=SensorDeviceClass.DATE,
+    ),
+    SensorEntityDescription(
+        key="data_last_read",
+        name="Last reading",
+        icon="mdi:gauge",
+        device_class=SensorDeviceClass.DATE,
+    ),
+)
+
+# Computed from the reading history rather than shown on the portal.
+FORECAST_DESCRIPTIONS = (
+    SensorEntityDescription(
+        key="daily_consumption",
+        name="Daily consumption",
+        icon="mdi:fire",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=f"{UnitOfVolume.GALLONS}/{UnitOfTime.DAYS}",
+        suggested_display_precision=1,
+    ),
+    SensorEntityDescription(
+        key="empty_date",
+        name="Projected empty date",
+        icon="mdi:propane-tank-outline",
+        device_class=SensorDeviceClass.DATE,
+    ),
+    SensorEntityDescription(
+        key="refill_cost",
+        name="Refill cost",
+        icon="mdi:cash",
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement=CURRENCY_DOLLAR,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class MyFuelPortalMetricSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor exposing one of the client's metrics."""
+
+    value_fn: Callable[[ClientMetrics], StateType]
+
+
+def _last_duration(stage: str) -> MyFuelPortalMetricSensorEntityDescription:
+    return MyFuelPortalMetricSensorEntityDescription(
+        key=f"{stage}_duration",
+        name=f"Last {stage} duration",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=3,
+        value_fn=lambda metrics: metrics.stages[stage].last,
+    )
+
+
+METRIC_DESCRIPTIONS = (
+    _last_duration("update"),
+    _last_duration("login"),
+    _last_duration("fetch"),
+    _last_duration("parse"),
+    MyFuelPortalMetricSensorEntityDescription(
+        key="logins",
+        name="Logins",
+        icon="mdi:login",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.logins,
+    ),
+    MyFuelPortalMetricSensorEntityDescription(
+        key="bytes_received",
+        name="Data received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        value_fn=lambda metrics: metrics.bytes_received,
+    ),
+    MyFuelPortalMetricSensorEntityDescription(
+        key="cache_hit_rate",
+        name="Unchanged page rate",
+        icon="mdi:cached",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=0,
+        value_fn=lambda metrics: (
+            None if metrics.cache_hit_rate is None else metrics.cache_hit_rate * 100
+        ),
+    ),
+    MyFuelPortalMetricSensorEntityDescription(
+        key="failures",
+        name="Failed updates",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.failures,
     ),
 )
 
@@ -30,28 +181,108 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
+    coordinator = entry.runtime_data.coordinator
     async_add_entities(
         MyFuelPortalSensor(
-            coordinator=entry.runtime_data.coordinator,
+            coordinator=coordinator,
+            tank_id=tank_id,
             entity_description=entity_description,
         )
+        for tank_id in coordinator.data
         for entity_description in ENTITY_DESCRIPTIONS
     )
+    async_add_entities(
+        MyFuelPortalForecastSensor(
+            coordinator=coordinator,
+            tank_id=tank_id,
+            entity_description=entity_description,
+        )
+        for tank_id in coordinator.data
+        for entity_description in FORECAST_DESCRIPTIONS
+    )
+    async_add_entities(
+        MyFuelPortalMetricSensor(
+            coordinator=coordinator,
+            entity_description=entity_description,
+        )
+        for entity_description in METRIC_DESCRIPTIONS
+    )
 
 
-class MyFuelPortalSensor(MyFuelPortalEntity, SensorEntity):
+class MyFuelPortalSensor(MyFuelPortalTankEntity, SensorEntity):
     """ha_my_fuel_portal Sensor class."""
 
     def __init__(
         self,
         coordinator: MyFuelPortalDataUpdateCoordinator,
+        tank_id: str,
         entity_description: SensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor class."""
+        super().__init__(coordinator, tank_id, entity_description.key)
+        self.entity_description = entity_description
+
+    @property
+    def native_value(self) -> str | int | float | date | None:
+        """Return the native value of the sensor."""
+        if (tank := self.tank) is None:
+            return None
+        return getattr(tank, self.entity_description.key)
+
+
+class MyFuelPortalForecastSensor(MyFuelPortalSensor):
+    """Sensor forecasting a tank's consumption from its reading history."""
+
+    @property
+    def native_value(self) -> float | date | None:
+        """Return the native value of the sensor."""
+        if (forecast := self.coordinator.forecasts.get(self._tank_id)) is None:
+            return None
+        return getattr(forecast, self.entity_description.key)
+
+
+class MyFuelPortalMetricSensor(MyFuelPortalEntity, SensorEntity):
+    """Diagnostic sensor for how polling the portal is going."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: MyFuelPortalMetricSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: MyFuelPortalDataUpdateCoordinator,
+        entity_description: MyFuelPortalMetricSensorEntityDescription,
     ) -> None:
         """Initialize the sensor class."""
         super().__init__(coordinator)
         self.entity_description = entity_description
+        entry = coordinator.config_entry
+        self._attr_unique_id = f"{entry.entry_id}_{entity_description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(entry.domain, entry.entry_id)},
+            name=entry.title,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Update on every poll, not only when the tank data changes."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_METRICS_UPDATED.format(self.coordinator.config_entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True; the metrics matter most when polling fails."""
+        return True
 
     @property
-    def native_value(self) -> str | None:
+    def native_value(self) -> StateType:
         """Return the native value of the sensor."""
-        return self.coordinator.data.get("body")
+        return self.entity_description.value_fn(
+            self.coordinator.config_entry.runtime_data.client.metrics
+        )
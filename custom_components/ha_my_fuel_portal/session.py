@@ -0,0 +1,86 @@
+"""Shared HTTP connection pool for ha_my_fuel_portal."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.util.hass_dict import HassKey
+from homeassistant.util.ssl import client_context
+from yarl import URL
+
+from . import metrics
+from .const import DOMAIN
+from .throttle import TokenBucket
+
+if TYPE_CHECKING:
+    from homeassistant.core import Event, HomeAssistant
+
+DATA_CONNECTOR: HassKey[aiohttp.TCPConnector] = HassKey(f"{DOMAIN}_connector")
+DATA_RATE_LIMITERS: HassKey[dict[str, TokenBucket]] = HassKey(f"{DOMAIN}_rate_limiters")
+
+# The portal is a single host, so a handful of kept-alive connections is
+# plenty for every account and the config flow combined.
+_CONNECTION_LIMIT = 16
+_CONNECTION_LIMIT_PER_HOST = 4
+_KEEPALIVE_TIMEOUT = 60
+_DNS_CACHE_TTL = 300
+# Requests per second to one host across all accounts; the burst covers a
+# login plus the tank page for a few accounts.
+_REQUEST_RATE = 1.0
+_REQUEST_BURST = 10
+
+
+@callback
+def async_get_connector(hass: HomeAssistant) -> aiohttp.TCPConnector:
+    """Return the connection pool shared by every portal session."""
+    if (connector := hass.data.get(DATA_CONNECTOR)) is not None:
+        return connector
+
+    connector = aiohttp.TCPConnector(
+        ssl=client_context(),
+        limit=_CONNECTION_LIMIT,
+        limit_per_host=_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=_DNS_CACHE_TTL,
+    )
+    hass.data[DATA_CONNECTOR] = connector
+
+    async def _async_close_connector(event: Event) -> None:  # noqa: ARG001
+        """Close connector pool."""
+        await connector.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_connector)
+
+    return connector
+
+
+@callback
+def async_create_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """
+    Create a session with its own cookie jar on top of the shared pool.
+
+    Each portal account gets its own session so that login cookies never leak
+    between accounts, while TCP and TLS connections are still reused. The
+    caller is responsible for closing the session.
+    """
+    return aiohttp.ClientSession(
+        connector=async_get_connector(hass),
+        connector_owner=False,
+        cookie_jar=aiohttp.CookieJar(),
+        headers={aiohttp.hdrs.USER_AGENT: SERVER_SOFTWARE},
+        trace_configs=[metrics.trace_config()],
+    )
+
+
+@callback
+def async_get_rate_limiter(hass: HomeAssistant, url: str) -> TokenBucket:
+    """Return the rate limiter shared by every client talking to url's host."""
+    limiters = hass.data.setdefault(DATA_RATE_LIMITERS, {})
+    host = URL(url).host or ""
+    if (limiter := limiters.get(host)) is None:
+        limiter = limiters[host] = TokenBucket(_REQUEST_RATE, _REQUEST_BURST)
+    return limiter
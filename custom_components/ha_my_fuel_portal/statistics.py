@@ -0,0 +1,129 @@
+"""Long-term statistics of the tank readings, imported into the recorder."""
+
+from __future__ import annotations
+
+import datetime
+import functools
+from typing import TYPE_CHECKING
+
+from homeassistant.const import CURRENCY_DOLLAR, UnitOfVolume
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .history import TankHistory
+
+# Reading fields imported as statistics, with their names and units.
+_STATISTICS = (
+    ("fuel_remaining", "Fuel remaining", UnitOfVolume.GALLONS),
+    ("price", "Fuel price", f"{CURRENCY_DOLLAR}/{UnitOfVolume.GALLONS}"),
+)
+_HOUR = datetime.timedelta(hours=1)
+
+
+def statistic_id(entry_id: str, tank_id: str, key: str) -> str:
+    """
+    Return the id of the external statistic for a field of a tank.
+
+    Tank ids are only unique within an account, so the id of the config
+    entry is part of it.
+    """
+    return f"{DOMAIN}:{slugify(f'{entry_id}_{tank_id}_{key}')}"
+
+
+def _statistic_start(day: datetime.date) -> datetime.datetime:
+    """
+    Return the start of the hourly statistic of a reading date.
+
+    That's the hour of local midnight, in UTC, as statistics start on the
+    hour and midnight isn't one in every time zone.
+    """
+    return dt_util.as_utc(dt_util.start_of_local_day(day)).replace(minute=0)
+
+
+def _statistic_day(start: float) -> datetime.date:
+    """Return the reading date of a statistic starting at ``start``."""
+    return (dt_util.as_local(dt_util.utc_from_timestamp(start)) + _HOUR).date()
+
+
+async def _async_last_start(hass: HomeAssistant, stat_id: str) -> float | None:
+    # The recorder pulls in sqlalchemy, so it's only imported once in use.
+    from homeassistant.components.recorder import get_instance  # noqa: PLC0415
+    from homeassistant.components.recorder.statistics import (  # noqa: PLC0415
+        get_last_statistics,
+    )
+
+    last = await get_instance(hass).async_add_executor_job(
+        functools.partial(
+            get_last_statistics,
+            hass,
+            1,
+            stat_id,
+            convert_units=False,
+            types=set(),
+        )
+    )
+    if rows := last.get(stat_id):
+        return rows[0]["start"]
+    return None
+
+
+async def async_import_statistics(
+    hass: HomeAssistant,
+    entry_id: str,
+    tank_id: str,
+    tank_name: str,
+    history: TankHistory,
+) -> int:
+    """
+    Import the readings of a tank the recorder doesn't have yet.
+
+    Each reading becomes the hourly statistic starting at midnight of its
+    reading date. The newest imported reading is imported again in case
+    the portal corrected it. Returns the number of statistics sent.
+    """
+    from homeassistant.components.recorder.models import (  # noqa: PLC0415
+        StatisticData,
+        StatisticMeanType,
+        StatisticMetaData,
+    )
+    from homeassistant.components.recorder.statistics import (  # noqa: PLC0415
+        async_add_external_statistics,
+    )
+
+    imported = 0
+    for key, name, unit in _STATISTICS:
+        stat_id = statistic_id(entry_id, tank_id, key)
+        start = None
+        if (last_start := await _async_last_start(hass, stat_id)) is not None:
+            start = _statistic_day(last_start)
+        statistics = [
+            StatisticData(
+                start=_statistic_start(reading.day),
+                mean=value,
+                min=value,
+                max=value,
+            )
+            for reading in history.readings(start=start)
+            if (value := getattr(reading, key)) is not None
+        ]
+        if not statistics:
+            continue
+        async_add_external_statistics(
+            hass,
+            StatisticMetaData(
+                mean_type=StatisticMeanType.ARITHMETIC,
+                has_sum=False,
+                name=f"{tank_name} {name.lower()}",
+                source=DOMAIN,
+                statistic_id=stat_id,
+                unit_of_measurement=unit,
+            ),
+            statistics,
+        )
+        imported += len(statistics)
+    return imported
@@ -0,0 +1,124 @@
+"""Rate limiting and circuit breaking for requests to the fuel portal."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class TokenBucket:
+    """
+    Spread requests out to at most ``rate`` per second, allowing bursts.
+
+    Every client talking to the same host shares one bucket, so a login
+    (up to four requests) fits in a burst while many accounts polling at once
+    are queued instead of hitting the portal together.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a full bucket refilling at ``rate`` tokens per second."""
+        self._rate = rate
+        self._capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it."""
+        self._refill()
+        # Tokens may go negative: each waiter reserves its own slot, so they
+        # are served in order without polling.
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self._rate)
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if delay := self.reserve():
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Stop calling the portal after repeated failures.
+
+    The breaker opens after ``threshold`` consecutive failures. Once the
+    cooldown has passed it lets a single probe through (half-open); success
+    closes it again, failure reopens it with twice the cooldown, and any
+    other end to the probe reopens it with the same cooldown.
+    """
+
+    def __init__(
+        self,
+        threshold: int,
+        cooldown: float,
+        max_cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a closed breaker."""
+        self._threshold = threshold
+        self._base_cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._clock = clock
+        self._failures = 0
+        self._cooldown = cooldown
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether requests are currently being held back."""
+        return self._opened_at is not None
+
+    def retry_in(self) -> float:
+        """Return the seconds left until the next probe is allowed."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self._cooldown - self._clock())
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent now."""
+        if self._opened_at is None:
+            return True
+        if self._probing or self.retry_in() > 0:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        self._failures = 0
+        self._cooldown = self._base_cooldown
+        self._opened_at = None
+        self._probing = False
+
+    def end_probe(self) -> None:
+        """Reopen the breaker if a probe ended without success or failure."""
+        if self._probing:
+            self._opened_at = self._clock()
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker once there are enough."""
+        self._failures += 1
+        if self._probing:
+            self._cooldown = min(self._cooldown * 2, self._max_cooldown)
+        elif self._failures < self._threshold:
+            return
+        self._opened_at = self._clock()
+        self._probing = False
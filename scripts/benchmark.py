@@ -0,0 +1,272 @@
+"""
+Benchmarks for tank page parsing and the fetch pipeline.
+
+Results are written as JSON so that two runs can be compared:
+
+    python -m scripts.benchmark --output before.json
+    python -m scripts.benchmark --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import importlib.resources
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+from yarl import URL
+
+from custom_components.ha_my_fuel_portal import parsing
+from custom_components.ha_my_fuel_portal.api import MyFuelPortalApiClient
+from tests import testdata
+from tests.fake_portal import FakePortal
+
+# ruff: noqa: T201
+
+_TANK_ROW = """
+<div class="row tank-row select-row">
+  <div class="col-sm-2"><a href="/RequestADelivery/Index/{tank_id}">Request</a></div>
+  <div class="col-sm-6 col-md-3">
+    <p><span class="text-larger">{tank_id} 240 GALLONS</span><br />
+    240 gal. | Propane<br />Fuel Tank</p>
+  </div>
+  <div class="col-sm-6 col-md-3">
+    <div class="progress"><div class="progress-bar" aria-valuenow="49"></div></div>
+    <div>Approximately 118 gallons in tank</div>
+    <div class="text-2">Monitored</div>
+    <div>Reading Date: 1/5/2025</div>
+  </div>
+  <div class="col-sm-6 col-md-2">
+    <div>Last Delivery: 12/22/2024</div>
+    <div><span style="color: #67af27;">$3.8090</span> / gal</div>
+  </div>
+</div>
+"""
+
+_FILLER = """
+<div class="row"><div class="col-md-4"><ul>
+  <li><a href="/Account/{i}">Account link {i}</a></li>
+  <li><a href="/Payments/{i}">Payment history {i}</a></li>
+</ul><p>Unrelated portal markup, navigation and scripts &amp; styles.</p></div></div>
+"""
+
+
+def synthetic_page(tanks: int = 1, filler: int = 0) -> str:
+    """Build a tank page with many tanks and unrelated markup around them."""
+    rows = "".join(_TANK_ROW.format(tank_id=100000 + i) for i in range(tanks))
+    noise = "".join(_FILLER.format(i=i) for i in range(filler))
+    return (
+        f"<html><head><title>Tank</title></head><body>{noise}"
+        f'<div class="box box-default"><div class="box-body">{rows}</div></div>'
+        f"{noise}</body></html>"
+    )
+
+
+def _pages() -> dict[str, str]:
+    files = importlib.resources.files(testdata)
+    return {
+        "sample1": files.joinpath("sample1.html").read_text(),
+        "sample2": files.joinpath("sample2.html").read_text(),
+        "tanks_100": synthetic_page(tanks=100),
+        "tanks_500": synthetic_page(tanks=500),
+        "filler_2000": synthetic_page(tanks=1, filler=2000),
+    }
+
+
+def _summarize(name: str, timings: list[float], **extra: object) -> dict:
+    return {
+        "name": name,
+        "iterations": len(timings),
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        **extra,
+    }
+
+
+def _bench(name: str, func: Callable[[], object], repeat: int, **extra: object) -> dict:
+    func()  # Warm up caches and lazy imports.
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return _summarize(name, timings, **extra)
+
+
+async def _abench(
+    name: str, func: Callable[[], Awaitable[object]], repeat: int
+) -> dict:
+    await func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return _summarize(name, timings)
+
+
+def _parse_with_layouts(html: str, layouts: dict) -> list[parsing.TankReading]:
+    parser = parsing.TankPageParser(layouts=layouts)
+    parser.feed(html.encode())
+    return parser.close()
+
+
+def bench_parsing(repeat: int) -> list[dict]:
+    """Time parse_tanks_html for every backend and page, and known layouts."""
+    results = []
+    for page_name, html in _pages().items():
+        for backend in parsing.BACKENDS:
+            results.append(
+                _bench(
+                    f"parse/{backend}/{page_name}",
+                    lambda html=html, backend=backend: parsing.parse_tanks_html(
+                        html, backend
+                    ),
+                    repeat,
+                    bytes=len(html),
+                )
+            )
+        # The warm up learns the page's layout, so it's timed on the layout path.
+        layouts = {}
+        results.append(
+            _bench(
+                f"parse/layout/{page_name}",
+                lambda html=html, layouts=layouts: _parse_with_layouts(html, layouts),
+                repeat,
+                bytes=len(html),
+            )
+        )
+    return results
+
+
+def bench_soup(repeat: int) -> list[dict]:
+    """Time soup construction for the full page and only the tank box."""
+    results = []
+    for page_name, html in _pages().items():
+        for only_tank_box in (False, True):
+            kind = "tank_box" if only_tank_box else "full"
+            results.append(
+                _bench(
+                    f"soup/{kind}/{page_name}",
+                    lambda html=html, only_tank_box=only_tank_box: parsing.make_soup(
+                        html, only_tank_box=only_tank_box
+                    ),
+                    repeat,
+                )
+            )
+    return results
+
+
+async def bench_cookies(repeat: int) -> list[dict]:
+    """Time exporting and restoring a logged in session."""
+    async with aiohttp.ClientSession() as session:
+        client = MyFuelPortalApiClient(
+            "user", "pass", "https://portal.test/Tank", session
+        )
+        session.cookie_jar.update_cookies(
+            {f"cookie{i}": f"value{i}" for i in range(20)},
+            URL("https://portal.test/"),
+        )
+        exported = client.export_session()
+        return [
+            _bench("cookies/export", client.export_session, repeat),
+            _bench("cookies/restore", lambda: client.restore_session(exported), repeat),
+            _bench("cookies/changed", client.session_changed, repeat),
+        ]
+
+
+async def bench_fetch(repeat: int) -> list[dict]:
+    """Time async_get_data end to end against the fake portal."""
+    results = []
+    for page_name, html in _pages().items():
+        portal = FakePortal(accounts={"user": "pass"}, page=html)
+        await portal.start()
+        url = portal.tank_url
+        try:
+            async with aiohttp.ClientSession(
+                cookie_jar=aiohttp.CookieJar(unsafe=True)
+            ) as session:
+                client = MyFuelPortalApiClient("user", "pass", url, session)
+                results.append(
+                    await _abench(
+                        f"fetch/warm/{page_name}", client.async_get_data, repeat
+                    )
+                )
+
+                async def cold_fetch(
+                    session: aiohttp.ClientSession = session,
+                    client: MyFuelPortalApiClient = client,
+                ) -> None:
+                    session.cookie_jar.clear()
+                    await client.async_get_data()
+
+                results.append(
+                    await _abench(f"fetch/login/{page_name}", cold_fetch, repeat)
+                )
+        finally:
+            await portal.stop()
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> bool:
+    """Print median changes against a baseline run, returning False on regression."""
+    previous = {result["name"]: result for result in baseline}
+    ok = True
+    for result in results:
+        if (before := previous.get(result["name"])) is None:
+            continue
+        ratio = result["median_s"] / before["median_s"]
+        regressed = ratio > threshold
+        ok = ok and not regressed
+        marker = "REGRESSION" if regressed else ""
+        print(f"{result['name']:50} {ratio:6.2f}x {marker}", file=sys.stderr)
+    return ok
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tank parsing and fetching")
+    parser.add_argument(
+        "--repeat", type=int, default=50, help="Iterations per benchmark"
+    )
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Median slowdown ratio that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    results = [
+        *bench_parsing(args.repeat),
+        *bench_soup(args.repeat),
+        *await bench_cookies(args.repeat),
+        *await bench_fetch(args.repeat),
+    ]
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:  # noqa: PTH123, ASYNC230
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:  # noqa: PTH123, ASYNC230
+            baseline = json.load(f)["results"]
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,530 @@
+import asyncio
+import datetime
+
+import aiohttp
+import pytest
+
+from custom_components.ha_my_fuel_portal.api import (
+    MyFuelPortalApiClient,
+    MyFuelPortalApiClientAuthenticationError,
+    MyFuelPortalApiClientCommunicationError,
+    MyFuelPortalApiClientError,
+)
+from custom_components.ha_my_fuel_portal.models import TankReading
+from custom_components.ha_my_fuel_portal.throttle import CircuitBreaker, TokenBucket
+
+from .fake_portal import (
+    HISTORY_PATHS,
+    LOGIN_PATH,
+    TANK_PATH,
+    TOKEN_FIELD,
+    FakePortal,
+    read_testdata,
+)
+
+_SAMPLE_1 = {
+    "123456": TankReading(
+        tank_id="123456",
+        name="123456 240 GALLONS / H /HW/GEN/POOL/COOK 1 MAIN ST 240",
+        tank_size=240,
+        fuel_remaining=118,
+        price=3.809,
+        delivery_mode="Monitored",
+        last_delivery=datetime.date(2024, 12, 22),
+        next_delivery=None,
+        data_last_read=datetime.date(2025, 1, 5),
+    ),
+}
+
+
+def _client(
+    portal: FakePortal,
+    session: aiohttp.ClientSession,
+    password: str = "hunter2",
+) -> MyFuelPortalApiClient:
+    return MyFuelPortalApiClient(
+        username="user@example.com",
+        password=password,
+        url=portal.tank_url,
+        session=session,
+    )
+
+
+async def test_login_once(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    assert await client.async_get_data() == _SAMPLE_1
+    assert await client.async_get_data() == _SAMPLE_1
+    assert fake_portal.login_count == 1
+
+
+async def test_metrics(fake_portal: FakePortal, portal_session: aiohttp.ClientSession):
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    fake_portal.default_page = read_testdata("sample1.html").replace(
+        "118 gallons", "90 gallons"
+    )
+    await client.async_get_data()
+    metrics = client.metrics
+    assert metrics.logins == 1
+    assert metrics.requests == 5
+    assert metrics.bytes_received > 0
+    assert metrics.page_fetches == 2
+    assert metrics.cache_hit_rate == 0.0
+    assert metrics.stages["parse"].count == 2
+    # The second page was extracted by the layout learned from the first.
+    assert metrics.fast_parses == 1
+    assert metrics.layout_parses == 1
+    assert metrics.tree_parses == 0
+    assert metrics.stages["fetch"].count == 3
+    assert metrics.failures == 0
+
+
+async def test_expired_session(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    fake_portal.expire_sessions()
+    assert await client.async_get_data() == _SAMPLE_1
+    assert fake_portal.login_count == 2
+    # The second login submitted the cached form straight away.
+    assert fake_portal.requests[f"GET {LOGIN_PATH}"] == 1
+    assert fake_portal.requests[f"POST {LOGIN_PATH}"] == 2
+    assert fake_portal.requests[f"GET {TANK_PATH}"] == 4
+
+
+async def test_stale_login_form(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    fake_portal.expire_sessions()
+    # Losing the anti-forgery cookie makes the portal reject the cached form.
+    portal_session.cookie_jar.clear(lambda morsel: morsel.key == TOKEN_FIELD)
+    assert await client.async_get_data() == _SAMPLE_1
+    assert fake_portal.login_count == 2
+    assert fake_portal.requests[f"GET {LOGIN_PATH}"] == 2
+
+
+async def test_relogin_before_session_expires(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    # The session cookie expires within the client's margin.
+    fake_portal.session_ttl = 30
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    assert client.session_expires is not None
+    fake_portal.requests.clear()
+
+    assert await client.async_get_data() == _SAMPLE_1
+    # The cached form was submitted without a redirect from the tank page.
+    assert fake_portal.login_count == 2
+    assert fake_portal.requests == {f"POST {LOGIN_PATH}": 1, f"GET {TANK_PATH}": 1}
+
+
+async def test_short_lived_cookie_keeps_session(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    # A cookie other than the session's expires within the client's margin.
+    fake_portal.tracking_cookie_ttl = 30
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    # As the coordinator does after a poll that changed the cookies.
+    client.export_session()
+    assert client.session_expires is None
+    fake_portal.requests.clear()
+
+    assert await client.async_get_data() == _SAMPLE_1
+    assert fake_portal.login_count == 1
+    assert fake_portal.requests == {f"GET {TANK_PATH}": 1}
+
+
+async def test_sliding_session(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    # The session cookie is renewed by every page, and would be within the
+    # client's margin a second after it was first set.
+    fake_portal.session_ttl = 61
+    fake_portal.sliding_sessions = True
+    client = _client(fake_portal, portal_session)
+    for _ in range(2):
+        assert await client.async_get_data() == _SAMPLE_1
+        await asyncio.sleep(0.6)
+    assert await client.async_get_data() == _SAMPLE_1
+    assert fake_portal.login_count == 1
+
+
+async def test_restored_session(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    assert client.session_changed()
+    exported = client.export_session()
+    assert not client.session_changed()
+
+    async with aiohttp.ClientSession(
+        cookie_jar=aiohttp.CookieJar(unsafe=True)
+    ) as other_session:
+        restored = _client(fake_portal, other_session)
+        restored.restore_session(exported)
+        assert await restored.async_get_data() == _SAMPLE_1
+        assert not restored.session_changed()
+        assert fake_portal.login_count == 1
+
+        # The login form is restored along with the cookies.
+        fake_portal.expire_sessions()
+        assert await restored.async_get_data() == _SAMPLE_1
+    assert fake_portal.login_count == 2
+    assert fake_portal.requests[f"GET {LOGIN_PATH}"] == 1
+
+
+async def test_concurrent_callers_share_login(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.latency = 0.05
+    client = _client(fake_portal, portal_session)
+    results = await asyncio.gather(*(client.async_get_data() for _ in range(5)))
+    assert all(result is results[0] for result in results)
+    assert results[0] == _SAMPLE_1
+    assert fake_portal.login_count == 1
+    assert fake_portal.requests[f"GET {TANK_PATH}"] == 2
+
+
+async def test_cancelled_caller_does_not_cancel_fetch(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.latency = 0.05
+    client = _client(fake_portal, portal_session)
+    impatient = asyncio.ensure_future(client.async_get_data())
+    patient = asyncio.ensure_future(client.async_get_data())
+    await asyncio.sleep(0.01)
+    impatient.cancel()
+    assert await patient == _SAMPLE_1
+    assert impatient.cancelled()
+
+
+async def test_bad_credentials(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session, password="wrong")
+    for _ in range(2):
+        with pytest.raises(MyFuelPortalApiClientAuthenticationError):
+            await client.async_get_data()
+    assert fake_portal.login_count == 0
+    # The credentials are only tried once per poll, with the cached form on
+    # the second one.
+    assert fake_portal.requests[f"POST {LOGIN_PATH}"] == 2
+    assert fake_portal.requests[f"GET {LOGIN_PATH}"] == 1
+
+
+async def test_other_redirect(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = MyFuelPortalApiClient(
+        username="user@example.com",
+        password="hunter2",
+        url=f"{fake_portal.tank_url}/",
+        session=portal_session,
+    )
+    assert await client.async_get_data() == _SAMPLE_1
+    assert await client.async_get_data() == _SAMPLE_1
+    # Only the redirect to the login page needed a login.
+    assert fake_portal.login_count == 1
+    assert fake_portal.requests[f"GET {TANK_PATH}/"] == 3
+
+
+async def test_other_login_path(portal_session: aiohttp.ClientSession):
+    portal = FakePortal()
+    portal.login_path = "/Portal/SignIn"
+    portal.history["readings"] = rows = _history(3)
+    await portal.start()
+    try:
+        client = _client(portal, portal_session)
+        assert await client.async_get_data() == _SAMPLE_1
+        # Once logged in there, the login page is known.
+        portal.expire_sessions()
+        assert await client.async_get_data() == _SAMPLE_1
+        assert portal.login_count == 2
+
+        portal.expire_sessions()
+        client = _client(portal, portal_session)
+        assert [record async for record in client.async_iter_history("readings")] == (
+            rows
+        )
+        assert portal.login_count == 3
+    finally:
+        await portal.stop()
+
+
+@pytest.mark.parametrize(
+    ("status", "error"),
+    [
+        (401, MyFuelPortalApiClientAuthenticationError),
+        (403, MyFuelPortalApiClientAuthenticationError),
+        (429, MyFuelPortalApiClientCommunicationError),
+        (503, MyFuelPortalApiClientCommunicationError),
+    ],
+)
+async def test_error_status(
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+    status: int,
+    error: type[Exception],
+):
+    fake_portal.inject_status(status, path=TANK_PATH)
+    with pytest.raises(error):
+        await _client(fake_portal, portal_session).async_get_data()
+
+
+async def test_error_status_releases_connection(fake_portal: FakePortal):
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=1),
+        cookie_jar=aiohttp.CookieJar(unsafe=True),
+    ) as session:
+        client = _client(fake_portal, session)
+        await client.async_get_data()
+        # Too long an error page to arrive along with the status.
+        fake_portal.error_page = "<p>Access denied</p>" * 100_000
+        fake_portal.inject_status(401, path=TANK_PATH)
+        with pytest.raises(MyFuelPortalApiClientAuthenticationError):
+            await client.async_get_data()
+        # The only connection was handed back for the next request.
+        async with asyncio.timeout(2):
+            assert await client.async_get_data() == _SAMPLE_1
+
+
+async def test_failing_portal_serves_last_result(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    first = await client.async_get_data()
+    fetched = client.last_fetched
+    assert fetched is not None
+
+    fake_portal.inject_status(503, count=3, path=TANK_PATH)
+    for _ in range(3):
+        with pytest.raises(MyFuelPortalApiClientCommunicationError):
+            await client.async_get_data()
+
+    fake_portal.requests.clear()
+    assert await client.async_get_data() is first
+    assert not fake_portal.requests
+    assert client.last_fetched == fetched
+
+
+async def test_many_accounts(socket_enabled: None):  # noqa: ARG001
+    accounts = {f"user{i}@example.com": f"password{i}" for i in range(20)}
+    portal = FakePortal(accounts=accounts)
+    portal.latency = 0.01
+    await portal.start()
+    try:
+        sessions = [
+            aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+            for _ in accounts
+        ]
+        clients = [
+            MyFuelPortalApiClient(username, password, portal.tank_url, session)
+            for (username, password), session in zip(
+                accounts.items(), sessions, strict=True
+            )
+        ]
+        for _ in range(2):
+            results = await asyncio.gather(
+                *(client.async_get_data() for client in clients)
+            )
+            assert results == [_SAMPLE_1] * len(accounts)
+        assert portal.logins == dict.fromkeys(accounts, 1)
+    finally:
+        for session in sessions:
+            await session.close()
+        await portal.stop()
+
+
+async def test_unchanged_page_keeps_result(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    first = await client.async_get_data()
+    assert await client.async_get_data() is first
+    assert client.metrics.unchanged_pages == 1
+    # The boxes were the same, so the tanks weren't extracted again.
+    assert client.metrics.fast_parses == 1
+    assert client.metrics.layout_parses == 0
+
+    fake_portal.default_page = read_testdata("sample2.html")
+    second = await client.async_get_data()
+    assert second != first
+    assert client.metrics.unchanged_pages == 1
+
+
+async def test_stops_reading_after_tank_box(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.default_page = (
+        read_testdata("sample1.html") + "</div></div>" + "<p>footer</p>" * 50_000
+    )
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    received = client.metrics.bytes_received
+    assert await client.async_get_data() == _SAMPLE_1
+    assert client.metrics.bytes_received - received < len(fake_portal.default_page) / 4
+
+
+async def test_reads_every_box(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    notice = '<div class="box-body"><p>Payments are down on Sunday.</p></div>'
+    fake_portal.default_page = (
+        f"<html><body>{notice}{read_testdata('sample2.html')}"
+        + "<p>footer</p>" * 1000
+        + read_testdata("sample1.html").replace("123456", "111")
+        + "</body></html>"
+    )
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    received = client.metrics.bytes_received
+    tanks = await client.async_get_data()
+    assert list(tanks) == ["123456", "111"]
+    # The whole page was read, leaving the connection to be reused.
+    assert client.metrics.bytes_received - received == len(
+        fake_portal.default_page.encode()
+    )
+
+
+async def test_not_modified(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.conditional_requests = True
+    client = _client(fake_portal, portal_session)
+    first = await client.async_get_data()
+    assert await client.async_get_data() is first
+    assert fake_portal.not_modified == 1
+
+
+async def test_multiple_tanks_single_fetch(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.default_page = read_testdata("sample1.html").replace(
+        "123456", "111"
+    ) + read_testdata("sample2.html").replace("123456", "222")
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    fake_portal.requests.clear()
+
+    tanks = await client.async_get_data()
+    assert list(tanks) == ["111", "222"]
+    assert tanks["222"].fuel_remaining == 181
+    assert fake_portal.requests == {f"GET {TANK_PATH}": 1}
+
+
+async def test_rate_limiter(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    # A stopped clock never refills the bucket, so every token is counted.
+    bucket = TokenBucket(rate=1000.0, capacity=1, clock=lambda: 0.0)
+    client = MyFuelPortalApiClient(
+        username="user@example.com",
+        password="hunter2",
+        url=fake_portal.tank_url,
+        session=portal_session,
+        rate_limiter=bucket,
+    )
+    await client.async_get_data()
+    # The first login took four requests, so three had to wait.
+    assert bucket.reserve() == pytest.approx(0.004)
+
+
+def _history(count: int) -> list[dict]:
+    first = datetime.date(2020, 1, 1)
+    return [
+        {
+            "tank_id": "123456",
+            "date": first + datetime.timedelta(days=30 * i),
+            "gallons": 100.0 + i,
+            "price": 3.5,
+        }
+        for i in range(count)
+    ]
+
+
+async def test_history_pagination(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.history["deliveries"] = rows = _history(95)
+    fake_portal.latency = 0.05
+    client = _client(fake_portal, portal_session)
+    records = [record async for record in client.async_iter_history("deliveries", 2)]
+    assert records == rows
+    assert fake_portal.requests[f"GET {HISTORY_PATHS['deliveries']}"] == 6
+    assert fake_portal.max_in_flight == 2
+
+
+async def test_history_session_expires_midway(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.history["deliveries"] = rows = _history(95)
+    fake_portal.latency = 0.05
+    client = _client(fake_portal, portal_session)
+    records = []
+    async for record in client.async_iter_history("deliveries"):
+        if not records:
+            fake_portal.expire_sessions()
+        records.append(record)
+    assert records == rows
+    # The pages loaded at once after the session expired logged in once.
+    assert fake_portal.login_count == 2
+
+
+async def test_history_breaker(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    client = _client(fake_portal, portal_session)
+    await client.async_get_data()
+    path = HISTORY_PATHS["readings"]
+    fake_portal.inject_status(503, count=3, path=path)
+    for _ in range(3):
+        with pytest.raises(MyFuelPortalApiClientCommunicationError):
+            [record async for record in client.async_iter_history("readings")]
+    with pytest.raises(MyFuelPortalApiClientCommunicationError, match="failing"):
+        [record async for record in client.async_iter_history("readings")]
+    assert fake_portal.requests[f"GET {path}"] == 3
+
+
+async def test_history_stops_early(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    fake_portal.history["readings"] = _history(200)
+    client = _client(fake_portal, portal_session)
+    history = client.async_iter_history("readings", 3)
+    async for record in history:
+        if record["gallons"] == 125:
+            break
+    await history.aclose()
+    # Two pages were needed; no more than the window were requested.
+    assert fake_portal.requests[f"GET {HISTORY_PATHS['readings']}"] <= 2 + 3
+
+
+async def test_failed_probe_reopens_breaker(
+    fake_portal: FakePortal, portal_session: aiohttp.ClientSession
+):
+    now = 0.0
+    client = _client(fake_portal, portal_session)
+    client._breaker = CircuitBreaker(1, 60, 240, clock=lambda: now)  # noqa: SLF001
+    await client.async_get_data()
+    fake_portal.inject_status(503, path=TANK_PATH)
+    with pytest.raises(MyFuelPortalApiClientCommunicationError):
+        await client.async_get_data()
+
+    # The probe finds a page without tanks.
+    now = 60
+    fake_portal.default_page = "<html><body></body></html>"
+    with pytest.raises(MyFuelPortalApiClientError):
+        await client.async_get_data()
+
+    now = 120
+    fake_portal.default_page = read_testdata("sample2.html")
+    tanks = await client.async_get_data()
+    assert tanks["123456"].fuel_remaining == 181
@@ -0,0 +1,26 @@
+from collections.abc import AsyncIterator
+
+import aiohttp
+import pytest
+
+from .fake_portal import FakePortal
+
+
+@pytest.fixture
+async def fake_portal(socket_enabled: None) -> AsyncIterator[FakePortal]:  # noqa: ARG001
+    portal = FakePortal()
+    await portal.start()
+    yield portal
+    await portal.stop()
+
+
+@pytest.fixture
+async def portal_session(
+    socket_enabled: None,  # noqa: ARG001
+) -> AsyncIterator[aiohttp.ClientSession]:
+    # The fake portal is served from an IP address, which the default cookie
+    # jar refuses to store cookies for.
+    async with aiohttp.ClientSession(
+        cookie_jar=aiohttp.CookieJar(unsafe=True)
+    ) as session:
+        yield session
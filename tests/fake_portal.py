@@ -0,0 +1,322 @@
+"""
+A stand-in for the fuel portal, for offline end-to-end and load testing.
+
+It serves the login form, issues session cookies, redirects unauthenticated
+requests away from ``/Tank`` and serves the testdata pages, as well as
+paginated delivery and reading history tables. Latency, error
+statuses and session expiry can be injected per test, and ETag based
+conditional requests can be turned on.
+
+It can also be run on its own as a load target:
+
+    python -m tests.fake_portal --port 8080 --accounts 100
+"""
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+import hashlib
+import importlib.resources
+import secrets
+import time
+
+from aiohttp import web
+from aiohttp.typedefs import Handler
+
+from . import testdata
+
+TANK_PATH = "/Tank"
+LOGIN_PATH = "/Account/Login"
+SESSION_COOKIE = ".AspNet.ApplicationCookie"
+TRACKING_COOKIE = "_tracking"
+TOKEN_FIELD = "__RequestVerificationToken"
+HISTORY_PATHS = {
+    "deliveries": "/DeliveryHistory",
+    "readings": "/TankReadingHistory",
+}
+HISTORY_PAGE_SIZE = 20
+
+_LOGIN_PAGE = """<html>
+<head><title>Log in</title></head>
+<body>
+  <p class="error">{error}</p>
+  <form action="{action}" method="post">
+    <input name="{token_field}" type="hidden" value="{token}">
+    <input name="EmailAddress" type="email">
+    <input name="Password" type="password">
+    <input name="RememberMe" type="checkbox" value="true">
+    <input type="submit" value="Log in">
+  </form>
+</body>
+</html>
+"""
+
+_HISTORY_PAGE = """<html>
+<head><title>History</title></head>
+<body>
+  <table class="table">
+    <thead><tr><th>Tank</th><th>Date</th><th>Gallons</th><th>Price / Gal</th></tr></thead>
+    <tbody>{rows}</tbody>
+  </table>
+  <ul class="pagination">{links}</ul>
+</body>
+</html>
+"""
+_HISTORY_ROW = (
+    "<tr><td>{tank_id}</td><td>{date:%-m/%-d/%Y}</td>"
+    "<td>{gallons:,.1f}</td><td>${price:.4f}</td></tr>"
+)
+
+
+def read_testdata(fname: str) -> str:
+    """Return the contents of a page in tests/testdata."""
+    return importlib.resources.files(testdata).joinpath(fname).read_text()
+
+
+@dataclasses.dataclass
+class _Session:
+    username: str
+    expires: float | None
+
+
+class FakePortal:
+    """An in-process fake of the fuel portal."""
+
+    def __init__(
+        self,
+        accounts: dict[str, str] | None = None,
+        page: str | None = None,
+    ) -> None:
+        """Create a portal serving ``page`` to every account by default."""
+        self.accounts = accounts or {"user@example.com": "hunter2"}
+        self.default_page = page if page is not None else read_testdata("sample1.html")
+        self.pages: dict[str, str] = {}
+        # Where the login page is served; set before starting the portal.
+        self.login_path = LOGIN_PATH
+        self.latency = 0.0
+        # Body of the injected error responses.
+        self.error_page = ""
+        self.session_ttl: float | None = None
+        # Whether the tank page renews the session, re-issuing its cookie.
+        self.sliding_sessions = False
+        # Max-age of a tracking cookie set with the tank page, if any.
+        self.tracking_cookie_ttl: int | None = None
+        self.conditional_requests = False
+        self.not_modified = 0
+        # History table rows by kind, as HistoryRecord-like dicts.
+        self.history: dict[str, list[dict]] = {kind: [] for kind in HISTORY_PATHS}
+        self.requests: collections.Counter[str] = collections.Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.logins: collections.Counter[str] = collections.Counter()
+        self._sessions: dict[str, _Session] = {}
+        self._faults: collections.deque[tuple[int, str | None]] = collections.deque()
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    @property
+    def tank_url(self) -> str:
+        """Return the absolute URL of the tank page."""
+        return f"{self.url}{TANK_PATH}"
+
+    @property
+    def login_count(self) -> int:
+        """Return the number of successful logins across all accounts."""
+        return sum(self.logins.values())
+
+    def inject_status(
+        self, status: int, count: int = 1, path: str | None = None
+    ) -> None:
+        """Answer the next ``count`` requests (to ``path``) with ``status``."""
+        self._faults.extend([(status, path)] * count)
+
+    def expire_sessions(self) -> None:
+        """Forget every issued session, as if the portal logged everyone out."""
+        self._sessions.clear()
+
+    def _take_fault(self, path: str) -> int | None:
+        for index, (status, fault_path) in enumerate(self._faults):
+            if fault_path is None or fault_path == path:
+                del self._faults[index]
+                return status
+        return None
+
+    def _session_user(self, request: web.Request) -> str | None:
+        token = request.cookies.get(SESSION_COOKIE)
+        if token is None or (session := self._sessions.get(token)) is None:
+            return None
+        if session.expires is not None and session.expires <= time.monotonic():
+            del self._sessions[token]
+            return None
+        return session.username
+
+    @web.middleware
+    async def _middleware(
+        self, request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        self.requests[f"{request.method} {request.path}"] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if (status := self._take_fault(request.path)) is not None:
+                headers = {"Retry-After": "60"} if status == 429 else None
+                return web.Response(
+                    status=status, text=self.error_page, headers=headers
+                )
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    def _login_page(self, error: str = "") -> web.Response:
+        token = secrets.token_hex(8)
+        response = web.Response(
+            text=_LOGIN_PAGE.format(
+                error=error,
+                action=self.login_path,
+                token_field=TOKEN_FIELD,
+                token=token,
+            ),
+            content_type="text/html",
+        )
+        response.set_cookie(TOKEN_FIELD, token)
+        return response
+
+    async def _handle_tank(self, request: web.Request) -> web.Response:
+        if (username := self._session_user(request)) is None:
+            raise web.HTTPFound(f"{self.login_path}?ReturnUrl={TANK_PATH}")
+        response = self._tank_page(request, self.pages.get(username, self.default_page))
+        if self.tracking_cookie_ttl is not None:
+            response.set_cookie(
+                TRACKING_COOKIE, secrets.token_hex(4), max_age=self.tracking_cookie_ttl
+            )
+        if self.sliding_sessions and self.session_ttl is not None:
+            token = request.cookies[SESSION_COOKIE]
+            self._sessions[token].expires = time.monotonic() + self.session_ttl
+            response.set_cookie(
+                SESSION_COOKIE, token, httponly=True, max_age=int(self.session_ttl)
+            )
+        return response
+
+    def _tank_page(self, request: web.Request, page: str) -> web.Response:
+        if not self.conditional_requests:
+            return web.Response(text=page, content_type="text/html")
+
+        etag = f'"{hashlib.sha1(page.encode()).hexdigest()}"'  # noqa: S324
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=page, content_type="text/html", headers={"ETag": etag})
+
+    async def _handle_tank_slash(self, _: web.Request) -> web.Response:
+        raise web.HTTPMovedPermanently(TANK_PATH)
+
+    async def _handle_history(self, request: web.Request) -> web.Response:
+        if self._session_user(request) is None:
+            raise web.HTTPFound(f"{self.login_path}?ReturnUrl={request.path}")
+        kind = next(
+            kind for kind, path in HISTORY_PATHS.items() if path == request.path
+        )
+        rows = self.history[kind]
+        page = int(request.query.get("page", "1"))
+        page_count = max(1, -(-len(rows) // HISTORY_PAGE_SIZE))
+        start = (page - 1) * HISTORY_PAGE_SIZE
+        return web.Response(
+            text=_HISTORY_PAGE.format(
+                rows="".join(
+                    _HISTORY_ROW.format(**row)
+                    for row in rows[start : start + HISTORY_PAGE_SIZE]
+                ),
+                links="".join(
+                    f'<li><a href="{request.path}?page={number}">{number}</a></li>'
+                    for number in range(1, page_count + 1)
+                ),
+            ),
+            content_type="text/html",
+        )
+
+    async def _handle_login_form(self, _: web.Request) -> web.Response:
+        return self._login_page()
+
+    async def _handle_login(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        token = request.cookies.get(TOKEN_FIELD)
+        if token is None or form.get(TOKEN_FIELD) != token:
+            return web.Response(status=400, text="Bad anti-forgery token")
+        username = form.get("EmailAddress")
+        if self.accounts.get(username) != form.get("Password"):
+            return self._login_page(error="Invalid login attempt.")
+
+        self.logins[username] += 1
+        session_token = secrets.token_hex(16)
+        self._sessions[session_token] = _Session(
+            username=username,
+            expires=None
+            if self.session_ttl is None
+            else time.monotonic() + self.session_ttl,
+        )
+        response = web.HTTPFound(TANK_PATH)
+        response.set_cookie(
+            SESSION_COOKIE,
+            session_token,
+            httponly=True,
+            max_age=None if self.session_ttl is None else int(self.session_ttl),
+        )
+        raise response
+
+    def make_app(self) -> web.Application:
+        """Build the aiohttp application serving the portal."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get(TANK_PATH, self._handle_tank)
+        app.router.add_get(f"{TANK_PATH}/", self._handle_tank_slash)
+        app.router.add_get(self.login_path, self._handle_login_form)
+        app.router.add_post(self.login_path, self._handle_login)
+        for path in HISTORY_PATHS.values():
+            app.router.add_get(path, self._handle_history)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start serving on the given address; port 0 picks a free port."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.url = f"http://{bound_host}:{bound_port}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    portal = FakePortal(
+        accounts={f"user{i}@example.com": "hunter2" for i in range(args.accounts)},
+    )
+    portal.latency = args.latency
+    portal.session_ttl = args.session_ttl
+    await portal.start(args.host, args.port)
+    print(f"Serving {args.accounts} accounts at {portal.tank_url}")  # noqa: T201
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await portal.stop()
+
+
+def main() -> None:
+    """Run the fake portal until interrupted."""
+    parser = argparse.ArgumentParser(description="Run a fake fuel portal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--accounts", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--session-ttl", type=float, default=None)
+    args = parser.parse_args()
+    asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import datetime
+
+import pytest
+
+from custom_components.ha_my_fuel_portal import forecast
+from custom_components.ha_my_fuel_portal.models import TankReading
+
+
+def test_linear_fit():
+    fit = forecast.LinearFit()
+    assert fit.slope is None
+    fit.add(0, 10)
+    assert fit.slope is None
+    fit.add(1, 8)
+    fit.add(2, 6)
+    assert fit.slope == pytest.approx(-2)
+
+
+def test_burn_rate_resets_on_delivery():
+    burn_rate = forecast.BurnRate.from_points([(0, 100), (1, 95), (2, 90)])
+    assert burn_rate.rate == pytest.approx(5)
+    # A delivery filled the tank back up.
+    burn_rate.add(3, 200)
+    assert burn_rate.rate is None
+    burn_rate.add(5, 196)
+    assert burn_rate.rate == pytest.approx(2)
+
+
+def test_degree_days():
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+    degree_days = forecast.DegreeDays()
+    degree_days.sample(start, 8.3)
+    degree_days.sample(start + datetime.timedelta(hours=6), 8.3)
+    assert degree_days.total == pytest.approx(2.5)
+    # Too long without a sample to know what happened in between.
+    degree_days.sample(start + datetime.timedelta(days=2), -10)
+    assert degree_days.total == pytest.approx(2.5)
+
+    restored = forecast.DegreeDays.from_dict(degree_days.as_dict())
+    assert restored == degree_days
+
+
+def test_forecast():
+    tank = TankReading(
+        tank_size=240,
+        fuel_remaining=118,
+        price=3.809,
+        data_last_read=datetime.date(2025, 1, 5),
+    )
+    assert forecast.forecast(tank, 2.0) == forecast.Forecast(
+        daily_consumption=2.0,
+        empty_date=datetime.date(2025, 3, 5),
+        refill_cost=281.87,
+    )
+    assert forecast.forecast(tank, None).empty_date is None
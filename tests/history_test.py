@@ -0,0 +1,100 @@
+import datetime
+from typing import Any
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.ha_my_fuel_portal.history import (
+    HistoryStore,
+    Reading,
+    TankHistory,
+)
+from custom_components.ha_my_fuel_portal.models import TankReading
+
+
+def _day(day: int) -> datetime.date:
+    return datetime.date(2025, 1, day)
+
+
+def test_add_and_range():
+    history = TankHistory()
+    assert history.latest is None
+    assert history.add(_day(3), 150, 3.5)
+    assert history.add(_day(1), 170, None)
+    assert history.add(_day(5), 120, 3.6)
+    assert len(history) == 3
+
+    assert history.readings(_day(2), _day(5)) == [
+        Reading(_day(3), 150, 3.5),
+        Reading(_day(5), 120, 3.6),
+    ]
+    assert history.readings(end=_day(1)) == [Reading(_day(1), 170, None)]
+    assert history.latest == Reading(_day(5), 120, 3.6)
+
+
+def test_duplicate_readings():
+    history = TankHistory()
+    assert history.add(_day(1), 170, None)
+    assert not history.add(_day(1), 170, None)
+    # The portal corrected the reading.
+    assert history.add(_day(1), 165, 3.5)
+    assert history.readings() == [Reading(_day(1), 165, 3.5)]
+
+
+def test_round_trip():
+    history = TankHistory()
+    history.add(_day(1), 170, None)
+    history.add(_day(2), 160, 3.809)
+    restored = TankHistory.from_dict(history.as_dict())
+    assert restored.readings() == history.readings()
+
+
+def _tank(day: int, fuel_remaining: int) -> TankReading:
+    return TankReading(
+        tank_id="123456",
+        fuel_remaining=fuel_remaining,
+        price=3.5,
+        data_last_read=_day(day),
+    )
+
+
+async def test_store(hass: HomeAssistant, hass_storage: dict[str, Any]):
+    store = HistoryStore(hass, "entry")
+    assert await store.async_record([_tank(1, 170)])
+    assert not await store.async_record([_tank(1, 170)])
+    assert await store.async_record([_tank(2, 160)])
+    await hass.async_stop(force=True)
+
+    assert "ha_my_fuel_portal/entry.history" in hass_storage
+    restored = HistoryStore(hass, "entry")
+    history = await restored.async_get("123456")
+    assert [reading.fuel_remaining for reading in history.readings()] == [170, 160]
+    assert len(await restored.async_get("other")) == 0
+
+
+async def test_burn_rate_is_updated_incrementally(hass: HomeAssistant):
+    store = HistoryStore(hass, "entry")
+    await store.async_record([_tank(1, 170)])
+    await store.async_record([_tank(3, 160)])
+    burn_rate = await store.async_burn_rate("123456", degree_days=False)
+    assert burn_rate.rate == pytest.approx(5)
+
+    await store.async_record([_tank(5, 140)])
+    assert await store.async_burn_rate("123456", degree_days=False) is burn_rate
+    assert burn_rate.rate == pytest.approx(7.5)
+
+    # A correction to an older reading refits the history.
+    await store.async_record([_tank(3, 150)])
+    refit = await store.async_burn_rate("123456", degree_days=False)
+    assert refit is not burn_rate
+    assert refit.rate == pytest.approx(7.5)
+    await hass.async_stop(force=True)
+
+
+async def test_degree_day_readings(hass: HomeAssistant):
+    store = HistoryStore(hass, "entry")
+    await store.async_record([_tank(1, 170)], degree_days=0)
+    await store.async_record([_tank(2, 160)], degree_days=20)
+    burn_rate = await store.async_burn_rate("123456", degree_days=True)
+    assert burn_rate.rate == pytest.approx(0.5)
+    await hass.async_stop(force=True)
@@ -1,37 +1,292 @@
+import dataclasses
 import datetime
 import importlib.resources
+import re
 
+import pytest
 from bs4 import BeautifulSoup
 
 from custom_components.ha_my_fuel_portal import parsing
+from custom_components.ha_my_fuel_portal.models import LoginForm, TankReading
 
 from . import testdata
 
 
+def _read_page(fname: str) -> str:
+    return importlib.resources.files(testdata).joinpath(fname).read_text()
+
+
 def _get_page(fname: str) -> str:
-    data = importlib.resources.files(testdata).joinpath(fname).read_text()
-    return BeautifulSoup(data, features="lxml")
+    return BeautifulSoup(_read_page(fname), features="lxml")
 
 
 def test_sample_1():
-    assert parsing.parse_tank(_get_page("sample1.html")) == {
-        "tank_size": 240,
-        "fuel_remaining": 118,
-        "price": 3.809,
-        "delivery_mode": "Monitored",
-        "last_delivery": datetime.date(2024, 12, 22),
-        "next_delivery": None,
-        "data_last_read": datetime.date(2025, 1, 5),
-    }
+    assert parsing.parse_tank(_get_page("sample1.html")) == TankReading(
+        tank_size=240,
+        fuel_remaining=118,
+        price=3.809,
+        delivery_mode="Monitored",
+        last_delivery=datetime.date(2024, 12, 22),
+        next_delivery=None,
+        data_last_read=datetime.date(2025, 1, 5),
+    )
 
 
 def test_sample_2():
-    assert parsing.parse_tank(_get_page("sample2.html")) == {
-        "tank_size": 240,
-        "fuel_remaining": 181,
-        "price": 2.299,
-        "delivery_mode": "Automatic",
-        "last_delivery": datetime.date(2025, 1, 3),
-        "next_delivery": datetime.date(2025, 2, 1),
-        "data_last_read": None,
+    assert parsing.parse_tank(_get_page("sample2.html")) == TankReading(
+        tank_size=240,
+        fuel_remaining=181,
+        price=2.299,
+        delivery_mode="Automatic",
+        last_delivery=datetime.date(2025, 1, 3),
+        next_delivery=datetime.date(2025, 2, 1),
+        data_last_read=None,
+    )
+
+
+@pytest.mark.parametrize("fname", ["sample1.html", "sample2.html"])
+def test_only_tank_box_soup(fname: str):
+    page = parsing.make_soup(_read_page(fname), only_tank_box=True)
+    assert parsing.parse_tank(page) == parsing.parse_tank(_get_page(fname))
+
+
+@pytest.mark.parametrize("backend", list(parsing.BACKENDS))
+@pytest.mark.parametrize("fname", ["sample1.html", "sample2.html"])
+def test_backends(backend: str, fname: str):
+    (tank,) = parsing.parse_tanks_html(_read_page(fname), backend)
+    assert tank.tank_id == "123456"
+    assert tank == dataclasses.replace(
+        parsing.parse_tank(_get_page(fname)), tank_id=tank.tank_id, name=tank.name
+    )
+
+
+@pytest.mark.parametrize("backend", list(parsing.BACKENDS))
+def test_multiple_tanks(backend: str):
+    page = """
+    <div class="box-body">
+      <div class="row tank-row">
+        <a href="/RequestADelivery/Index/111">Request a Delivery</a>
+        <span class="text-larger">House</span> 500 gal. | Propane
+        <div>Approximately 250 gallons in tank</div>
+        <div class="text-2">Automatic</div>
+      </div>
+      <div class="row tank-row">
+        <span class="text-larger">Pool</span> 100 gal. | Propane
+        <div>Approximately 20 gallons in tank</div>
+        <span>$2.50</span>
+      </div>
+    </div>
+    """
+    assert [tank.as_dict() for tank in parsing.parse_tanks_html(page, backend)] == [
+        {
+            "tank_id": "111",
+            "name": "House",
+            "tank_size": 500,
+            "fuel_remaining": 250,
+            "price": None,
+            "delivery_mode": "Automatic",
+            "last_delivery": None,
+            "next_delivery": None,
+            "data_last_read": None,
+        },
+        {
+            "tank_id": "Pool",
+            "name": "Pool",
+            "tank_size": 100,
+            "fuel_remaining": 20,
+            "price": 2.5,
+            "delivery_mode": None,
+            "last_delivery": None,
+            "next_delivery": None,
+            "data_last_read": None,
+        },
+    ]
+
+
+@pytest.mark.parametrize("backend", list(parsing.BACKENDS))
+def test_other_boxes(backend: str):
+    notice = """
+    <div class="box box-info">
+      <div class="box-body">
+        <p>Online payments are unavailable on Sunday.</p>
+        <a href="/Account/Payments">Payment history</a>
+      </div>
+    </div>
+    """
+    page = _read_page("sample2.html") + notice
+    assert parsing.parse_tanks_html(page, backend) == parsing.parse_tanks_html(
+        _read_page("sample2.html"), backend
+    )
+
+
+@pytest.mark.parametrize("fname", ["sample1.html", "sample2.html"])
+def test_tank_page_parser_chunks(fname: str):
+    notice = '<div class="box-body"><a href="/Account/Payments">Pay</a></div>'
+    page = f"<html><body>{notice}{_read_page(fname)}</div></div><p>footer</p>"
+    parser = parsing.TankPageParser(encoding="utf-8")
+    for start in range(0, len(page), 7):
+        parser.feed(page[start : start + 7].encode())
+    assert not parser.done
+    assert parser.close() == parsing.parse_tanks_html(page)
+    assert parser.path == parsing.FAST_PATH
+
+
+def test_tank_page_parser_done():
+    page = f"{_read_page('sample2.html')}{'<p>footer</p>' * 20_000}".encode()
+    parser = parsing.TankPageParser()
+    fed = 0
+    while not parser.done:
+        parser.feed(page[fed : fed + 8192])
+        fed += 8192
+    # Feeding stopped long after the box, well before the end of the page.
+    assert fed < len(page) / 2
+    assert parser.close() == parsing.parse_tanks_html(page)
+
+
+@pytest.mark.parametrize(
+    ("old", "new"),
+    [
+        # A name the pattern can't follow.
+        ('<span class="text-larger">', '<span class="text-larger"><b>House</b> '),
+        # A missing price.
+        ("$3.8090", "call"),
+        # A date that isn't next to its label.
+        ("1/5/2025", "<b>1/5/2025</b>"),
+        # A second tank.
+        (
+            '<div class="row tank',
+            '<div class="row tank-row"></div><div class="row tank',
+        ),
+    ],
+)
+def test_tank_page_parser_falls_back(old: str, new: str):
+    page = _read_page("sample1.html").replace(old, new, 1)
+    parser = parsing.TankPageParser()
+    parser.feed(page.encode())
+    assert parser.close() == parsing.BACKENDS["lxml"](page)
+    assert parser.path == parsing.TREE_PATH
+
+
+@pytest.mark.parametrize(
+    ("old", "new", "path"),
+    [
+        # The same layout with other readings.
+        ("118 gallons", "90 gallons", parsing.LAYOUT_PATH),
+        ("$3.8090", "$3.5000", parsing.LAYOUT_PATH),
+        ("Monitored", "Automatic", parsing.LAYOUT_PATH),
+        # A field the layout's extractor doesn't find.
+        ("$3.8090", "call", parsing.TREE_PATH),
+        # Another layout.
+        ("<br />", "<br /><b>Tank</b>", parsing.FAST_PATH),
+    ],
+)
+def test_tank_page_parser_layouts(old: str, new: str, path: str):
+    layouts = {}
+    page = _read_page("sample1.html")
+    parser = parsing.TankPageParser(layouts=layouts)
+    parser.feed(page.encode())
+    parser.close()
+    assert parser.path == parsing.FAST_PATH
+
+    page = page.replace(old, new, 1)
+    parser = parsing.TankPageParser(layouts=layouts)
+    parser.feed(page.encode())
+    assert parser.close() == parsing.BACKENDS["lxml"](page)
+    assert parser.path == path
+
+
+def test_tank_page_parser_layout_sparse():
+    layouts = {}
+    page = _read_page("sample1.html")
+    # A page without dates has the same tags, so it's learned as the layout.
+    sparse = re.sub(r"(Reading Date|Last Delivery):\s*[\d/]+", "", page)
+    parser = parsing.TankPageParser(layouts=layouts)
+    parser.feed(sparse.encode())
+    assert parser.close() == parsing.BACKENDS["lxml"](sparse)
+    assert parser.path == parsing.FAST_PATH
+
+    parser = parsing.TankPageParser(layouts=layouts)
+    parser.feed(page.encode())
+    assert parser.close() == parsing.BACKENDS["lxml"](page)
+    assert parser.path == parsing.LAYOUT_PATH
+
+
+def test_tank_page_parser_tree_layout():
+    layouts = {}
+    page = _read_page("sample1.html").replace(
+        '<div class="row tank', '<div class="row tank-row"></div><div class="row tank'
+    )
+    for _ in range(2):
+        parser = parsing.TankPageParser(layouts=layouts)
+        parser.feed(page.encode())
+        assert parser.close() == parsing.BACKENDS["lxml"](page)
+        assert parser.path == parsing.TREE_PATH
+    # The layout was learned as one that needs the tree.
+    (layout,) = layouts.values()
+    assert layout.pattern is None
+
+
+def test_no_tank_box():
+    assert parsing.parse_tanks_html("<html><body></body></html>") == []
+
+
+def test_login_form():
+    page = BeautifulSoup(
+        """
+        <form action="/Account/Login" method="POST">
+          <input name="__RequestVerificationToken" type="hidden" value="token">
+          <input name="EmailAddress" type="text">
+          <input name="Password" type="password">
+          <input name="RememberMe" type="checkbox">
+          <input type="submit" value="Log in">
+        </form>
+        """,
+        features="lxml",
+    )
+    form = parsing.parse_login_form(page)
+    assert form == LoginForm(
+        action="/Account/Login",
+        method="post",
+        fields={
+            "__RequestVerificationToken": "token",
+            "EmailAddress": "",
+            "Password": "",
+        },
+    )
+
+
+def test_history_page():
+    page = BeautifulSoup(
+        """
+        <table>
+          <tr><th>Date</th><th>Quantity (gal)</th><th>Price</th><th>Notes</th></tr>
+          <tr><td>12/22/2024</td><td>1,120.5</td><td>$3.8090</td><td>Fill</td></tr>
+          <tr><td>Total</td><td>1,120.5</td><td></td><td></td></tr>
+        </table>
+        <a href="/DeliveryHistory?page=2">2</a>
+        <a href="/DeliveryHistory?page=3">Last</a>
+        """,
+        features="lxml",
+    )
+    assert parsing.parse_history_page(page) == (
+        [
+            {
+                "tank_id": None,
+                "date": datetime.date(2024, 12, 22),
+                "gallons": 1120.5,
+                "price": 3.809,
+            }
+        ],
+        3,
+    )
+
+
+def test_tank_reading():
+    tank = parsing.parse_tank(_get_page("sample1.html"))
+    assert hash(tank) == hash(parsing.parse_tank(_get_page("sample1.html")))
+    assert TankReading.from_json(tank.as_json()) == tank
+    assert tank.diff(tank) == frozenset()
+    assert tank.diff(dataclasses.replace(tank, fuel_remaining=100)) == {
+        "fuel_remaining"
     }
+    assert tank.diff(None) == set(tank.as_dict())
@@ -0,0 +1,67 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+_PACKAGE = "custom_components.ha_my_fuel_portal"
+# What Home Assistant imports to load the integration and offer its config
+# flow, before the first poll.
+_STARTUP_MODULES = (_PACKAGE, f"{_PACKAGE}.config_flow")
+# Home Assistant modules already imported by the time an integration loads,
+# so only what the integration adds is timed.
+_PRELOADED_MODULES = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.data_entry_flow",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.selector",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.binary_sensor",
+    "homeassistant.components.sensor",
+    "homeassistant.components.switch",
+)
+# Modules only needed once there's a page to parse, or readings to import.
+_DEFERRED_DEPENDENCIES = (
+    "bs4",
+    "lxml",
+    f"{_PACKAGE}.parsing",
+    "homeassistant.components.recorder",
+    "sqlalchemy",
+)
+# Cumulative import time of the startup modules, with their dependencies, in
+# microseconds. Before the integration's own work it took 40-60 ms here, and
+# importing the recorder alone takes about 500 ms.
+_IMPORT_BUDGET_US = 100_000
+
+
+def _import_in_subprocess() -> tuple[list[str], int]:
+    """Import the startup modules in a fresh interpreter."""
+    code = (
+        "import json, sys\n"
+        + "".join(f"import {module}\n" for module in _PRELOADED_MODULES)
+        + "".join(f"import {module}\n" for module in _STARTUP_MODULES)
+        + f"loaded = [m for m in {_DEFERRED_DEPENDENCIES!r} if m in sys.modules]\n"
+        + "print(json.dumps(loaded))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=pathlib.Path(__file__).parent.parent,
+        text=True,
+    )
+    # Lines look like "import time:  self [us] | cumulative | package".
+    startup_time = 0
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[2].strip() in _STARTUP_MODULES:  # noqa: PLR2004
+            startup_time += int(fields[1])
+    return json.loads(result.stdout), startup_time
+
+
+def test_startup_imports():
+    loaded, startup_time = _import_in_subprocess()
+    assert loaded == []
+    assert 0 < startup_time < _IMPORT_BUDGET_US
@@ -0,0 +1,285 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_PASSWORD, CONF_URL, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from homeassistant.util.unit_system import US_CUSTOMARY_SYSTEM
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.ha_my_fuel_portal.const import (
+    CONF_MAX_STALE_AGE,
+    CONF_TEMPERATURE_ENTITY,
+    DOMAIN,
+)
+from custom_components.ha_my_fuel_portal.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.ha_my_fuel_portal.models import TankReading
+from custom_components.ha_my_fuel_portal.scheduling import (
+    DEFAULT_INTERVAL,
+    MAX_INTERVAL,
+)
+from custom_components.ha_my_fuel_portal.sensor import MyFuelPortalSensor
+
+from .fake_portal import TANK_PATH, FakePortal, read_testdata
+
+_ENTRY_ID = "01JTESTENTRY"
+_FUEL_REMAINING = (
+    "sensor.123456_240_gallons_h_hw_gen_pool_cook_1_main_st_240_fuel_remaining"
+)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None):  # noqa: ARG001
+    return
+
+
+async def _setup_entry(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+    *,
+    setup: bool = True,
+) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        entry_id=_ENTRY_ID,
+        data={
+            CONF_USERNAME: "user@example.com",
+            CONF_PASSWORD: "hunter2",
+            CONF_URL: fake_portal.tank_url,
+        },
+    )
+    entry.add_to_hass(hass)
+    with patch(
+        "custom_components.ha_my_fuel_portal.async_create_session",
+        return_value=portal_session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id) is setup
+        await hass.async_block_till_done()
+    return entry
+
+
+async def test_setup_entry(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    hass.config.units = US_CUSTOMARY_SYSTEM
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+
+    state = hass.states.get(_FUEL_REMAINING)
+    assert state is not None
+    assert state.state == "118"
+    assert state.attributes["unit_of_measurement"] == "gal"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.parametrize(("age", "expected"), [(1, "50"), (48, "unavailable")])
+async def test_setup_from_saved_readings(
+    hass: HomeAssistant,
+    hass_storage: dict,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+    age: int,
+    expected: str,
+):
+    hass.config.units = US_CUSTOMARY_SYSTEM
+    hass_storage[f"{DOMAIN}/{_ENTRY_ID}.readings"] = {
+        "version": 1,
+        "data": {
+            "fetched": (dt_util.utcnow() - timedelta(hours=age)).isoformat(),
+            "tanks": {
+                "123456": TankReading(
+                    tank_id="123456", name="Main St", fuel_remaining=50
+                ).as_json()
+            },
+        },
+    }
+    # The portal is down; recent saved readings are shown until they get too
+    # old, while older ones leave the entry to retry setup.
+    fake_portal.inject_status(500, count=10)
+    entry = await _setup_entry(hass, fake_portal, portal_session, setup=age == 1)
+
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert fake_portal.requests[f"GET {TANK_PATH}"] == 1
+    state = hass.states.get("sensor.main_st_fuel_remaining")
+    assert (state.state if state is not None else "unavailable") == expected
+
+    if entry.state is ConfigEntryState.LOADED:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_saved_changes(
+    hass: HomeAssistant,
+    hass_storage: dict,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    key = f"{DOMAIN}/{_ENTRY_ID}.readings"
+    changes = [(dt_util.now() - timedelta(days=days)).isoformat() for days in (3, 2, 1)]
+    hass_storage[key] = {
+        "version": 1,
+        "data": {
+            "fetched": dt_util.utcnow().isoformat(),
+            "tanks": {"123456": TankReading(tank_id="123456").as_json()},
+            "changes": changes,
+        },
+    }
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    # The portal's data differs from the saved readings, which is a change
+    # saved along with the earlier ones.
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=5))
+    await hass.async_block_till_done()
+    saved = hass_storage[key]["data"]["changes"]
+    assert len(saved) == len(changes) + 1
+    assert [dt_util.parse_datetime(change) for change in saved[:-1]] == [
+        dt_util.parse_datetime(change) for change in changes
+    ]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_failed_update_resets_interval(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+    coordinator = entry.runtime_data.coordinator
+    coordinator.update_interval = MAX_INTERVAL
+
+    fake_portal.inject_status(500, path=TANK_PATH)
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == DEFAULT_INTERVAL
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_failing_portal_readings_get_stale(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+    coordinator = entry.runtime_data.coordinator
+    client = entry.runtime_data.client
+    fetched = coordinator.last_fetched
+
+    # Open the client's circuit breaker, which then serves its last result.
+    fake_portal.inject_status(503, count=3, path=TANK_PATH)
+    for _ in range(4):
+        await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert coordinator.last_fetched == fetched
+
+    # That result doesn't count as fresh once it's too old.
+    client.last_fetched -= timedelta(hours=48).total_seconds()
+    coordinator.last_fetched -= timedelta(hours=48)
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert hass.states.get(_FUEL_REMAINING).state == "unavailable"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_update_changed_fields_only(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+    coordinator = entry.runtime_data.coordinator
+
+    fake_portal.default_page = read_testdata("sample1.html").replace(
+        "118 gallons", "100 gallons"
+    )
+    with patch.object(
+        MyFuelPortalSensor, "async_write_ha_state", autospec=True
+    ) as write_state:
+        await coordinator.async_refresh()
+    assert {call.args[0].entity_description.key for call in write_state.mock_calls} == {
+        "fuel_remaining",
+        "refill_cost",
+    }
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_diagnostics(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["entry"]["data"][CONF_PASSWORD] == "**REDACTED**"
+    assert diagnostics["metrics"]["logins"] == 1
+    assert diagnostics["metrics"]["stages"]["update"]["count"] == 1
+    assert list(diagnostics["tanks"]) == ["123456"]
+
+    # The metric sensors are diagnostic and disabled by default.
+    entity_registry = er.async_get(hass)
+    entity_id = entity_registry.async_get_entity_id(
+        "sensor", DOMAIN, f"{entry.entry_id}_logins"
+    )
+    assert entity_id is not None
+    assert entity_registry.async_get(entity_id).disabled_by is not None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_temperature_option(
+    hass: HomeAssistant,
+    fake_portal: FakePortal,
+    portal_session: aiohttp.ClientSession,
+):
+    hass.states.async_set("sensor.outside", "50", {"unit_of_measurement": "°F"})
+    entry = await _setup_entry(hass, fake_portal, portal_session)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == "form"
+    # Reloading the entry closes its session, so hand out a fresh one.
+    with patch(
+        "custom_components.ha_my_fuel_portal.async_create_session",
+        side_effect=lambda _: aiohttp.ClientSession(
+            cookie_jar=aiohttp.CookieJar(unsafe=True)
+        ),
+    ):
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            {CONF_TEMPERATURE_ENTITY: "sensor.outside", CONF_MAX_STALE_AGE: 12},
+        )
+        await hass.async_block_till_done()
+    assert entry.options == {
+        CONF_TEMPERATURE_ENTITY: "sensor.outside",
+        CONF_MAX_STALE_AGE: 12,
+    }
+
+    # The reloaded entry samples the temperature as it changes.
+    hass.states.async_set("sensor.outside", "41", {"unit_of_measurement": "°F"})
+    await hass.async_block_till_done()
+    degree_days = entry.runtime_data.history._degree_days  # noqa: SLF001
+    assert degree_days.last_temperature == pytest.approx(5)
+    assert degree_days.total > 0
+
+    # The forecast sensors exist before there's enough history to forecast
+    # consumption.
+    state = hass.states.get(
+        "sensor.123456_240_gallons_h_hw_gen_pool_cook_1_main_st_240_refill_cost"
+    )
+    assert state is not None
+    assert state.state == "281.87"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,71 @@
+import datetime
+
+from custom_components.ha_my_fuel_portal import scheduling
+from custom_components.ha_my_fuel_portal.models import TankReading
+
+_TZ = datetime.UTC
+
+
+def _at(day: int, hour: int, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(2025, 1, day, hour, minute, tzinfo=_TZ)
+
+
+def _tank(**kwargs: datetime.date | None) -> TankReading:
+    return TankReading(**kwargs)
+
+
+# The portal was seen to publish new readings around 6am.
+_CHANGES = [_at(1, 6, 10), _at(2, 5, 55), _at(3, 6, 5)]
+
+
+def test_default_without_history():
+    assert (
+        scheduling.next_update_interval([_tank()], [], _at(4, 12))
+        == scheduling.DEFAULT_INTERVAL
+    )
+
+
+def test_delivery_due():
+    tank = _tank(next_delivery=datetime.date(2025, 1, 4))
+    assert (
+        scheduling.next_update_interval([tank], _CHANGES, _at(4, 12))
+        == scheduling.MIN_INTERVAL
+    )
+
+
+def test_sleep_until_window():
+    assert scheduling.next_update_interval(
+        [_tank()], _CHANGES, _at(4, 1)
+    ) == datetime.timedelta(hours=4, minutes=5)
+
+
+def test_in_window():
+    assert (
+        scheduling.next_update_interval([_tank()], _CHANGES, _at(4, 6, 30))
+        == scheduling.MIN_INTERVAL
+    )
+
+
+def test_late_update():
+    assert (
+        scheduling.next_update_interval([_tank()], _CHANGES, _at(4, 9))
+        == scheduling.DEFAULT_INTERVAL
+    )
+
+
+def test_back_off_after_update():
+    changes = [*_CHANGES, _at(4, 6)]
+    assert (
+        scheduling.next_update_interval([_tank()], changes, _at(4, 7))
+        == scheduling.MAX_INTERVAL
+    )
+    assert scheduling.next_update_interval(
+        [_tank()], changes, _at(4, 20)
+    ) == datetime.timedelta(hours=9)
+
+
+def test_back_off_after_reading_without_history():
+    tank = _tank(data_last_read=datetime.date(2025, 1, 4))
+    assert scheduling.next_update_interval(
+        [tank], [], _at(4, 18)
+    ) == datetime.timedelta(hours=6)
@@ -0,0 +1,107 @@
+import datetime
+import functools
+
+from homeassistant.components.recorder import Recorder
+from homeassistant.components.recorder.statistics import (
+    get_last_statistics,
+    valid_statistic_id,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+
+from custom_components.ha_my_fuel_portal.history import TankHistory
+from custom_components.ha_my_fuel_portal.statistics import (
+    async_import_statistics,
+    statistic_id,
+)
+
+_ENTRY_ID = "entry"
+
+
+def _day(day: int) -> datetime.date:
+    return datetime.date(2025, 1, day)
+
+
+async def _last(hass: HomeAssistant, key: str) -> list[dict]:
+    stat_id = statistic_id(_ENTRY_ID, "123456", key)
+    return (
+        await hass.async_add_executor_job(
+            functools.partial(
+                get_last_statistics,
+                hass,
+                10,
+                stat_id,
+                convert_units=False,
+                types={"mean"},
+            )
+        )
+    ).get(stat_id, [])
+
+
+async def test_import_statistics(recorder_mock: Recorder, hass: HomeAssistant):  # noqa: ARG001
+    history = TankHistory()
+    history.add(_day(1), 170, None)
+    history.add(_day(2), 160, 3.5)
+    assert (
+        await async_import_statistics(hass, _ENTRY_ID, "123456", "Tank", history) == 3
+    )
+    await async_wait_recording_done(hass)
+
+    fuel = await _last(hass, "fuel_remaining")
+    assert [row["mean"] for row in fuel] == [160, 170]
+    assert fuel[0]["start"] == dt_util.start_of_local_day(_day(2)).timestamp()
+    assert [row["mean"] for row in await _last(hass, "price")] == [3.5]
+
+    # Only the newest imported reading is sent again.
+    history.add(_day(3), 150, 3.5)
+    assert (
+        await async_import_statistics(hass, _ENTRY_ID, "123456", "Tank", history) == 4
+    )
+    await async_wait_recording_done(hass)
+    assert [row["mean"] for row in await _last(hass, "fuel_remaining")] == [
+        150,
+        160,
+        170,
+    ]
+
+
+def test_statistic_id_from_name():
+    stat_id = statistic_id(
+        "01JHGKV0ZC4J3XN1TA9W7E3M5Q",
+        "123456 240 GALLONS / H /HW/GEN/POOL",
+        "fuel_remaining",
+    )
+    assert valid_statistic_id(stat_id)
+
+
+def test_statistic_id_per_entry():
+    # Tanks without an id fall back to their position, the same on every
+    # account.
+    assert statistic_id("entry1", "0", "price") != statistic_id("entry2", "0", "price")
+
+
+async def test_import_statistics_half_hour_zone(
+    recorder_mock: Recorder,  # noqa: ARG001
+    hass: HomeAssistant,
+):
+    await hass.config.async_set_time_zone("Asia/Kolkata")
+    history = TankHistory()
+    history.add(_day(1), 170, None)
+    assert (
+        await async_import_statistics(hass, _ENTRY_ID, "123456", "Tank", history) == 1
+    )
+    await async_wait_recording_done(hass)
+
+    (row,) = await _last(hass, "fuel_remaining")
+    # Local midnight is 18:30 UTC; the statistic starts on the hour before.
+    start = dt_util.utc_from_timestamp(row["start"])
+    assert start == datetime.datetime(2024, 12, 31, 18, tzinfo=datetime.UTC)
+
+    # The reading isn't taken for the day before when importing again.
+    history.add(_day(2), 160, None)
+    assert (
+        await async_import_statistics(hass, _ENTRY_ID, "123456", "Tank", history) == 2
+    )
@@ -0,0 +1,72 @@
+import pytest
+
+from custom_components.ha_my_fuel_portal.throttle import CircuitBreaker, TokenBucket
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_burst_then_rate():
+    clock = _Clock()
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Waiters queue up behind one another.
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now = 10.0
+    assert bucket.reserve() == 0.0
+
+
+def test_circuit_breaker_opens_after_threshold():
+    clock = _Clock()
+    breaker = CircuitBreaker(threshold=3, cooldown=60, max_cooldown=240, clock=clock)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert not breaker.is_open
+
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow_request()
+    assert breaker.retry_in() == 60
+
+
+def test_circuit_breaker_half_open_probe():
+    clock = _Clock()
+    breaker = CircuitBreaker(threshold=1, cooldown=60, max_cooldown=100, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 60
+    # Only one probe goes through.
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.retry_in() == 100
+
+    clock.now = 160
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_circuit_breaker_probe_ends_otherwise():
+    clock = _Clock()
+    breaker = CircuitBreaker(threshold=1, cooldown=60, max_cooldown=240, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 60
+    assert breaker.allow_request()
+    breaker.end_probe()
+    # Reopened with the same cooldown.
+    assert breaker.is_open
+    assert breaker.retry_in() == 60
+
+    clock.now = 120
+    assert breaker.allow_request()